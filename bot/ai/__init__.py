@@ -3,5 +3,6 @@
 from bot.ai.mistral_client import MistralClient
 from bot.ai.template_manager import TemplateManager
 from bot.ai.conversation_manager import ConversationManager
+from bot.ai.llm_cache import LLMCache
 
-__all__ = ['MistralClient', 'TemplateManager', 'ConversationManager']
+__all__ = ['MistralClient', 'TemplateManager', 'ConversationManager', 'LLMCache']
@@ -1,53 +1,164 @@
 """Gestionnaire de l'historique de conversation"""
 
+import asyncio
 import logging
-from typing import List, Dict
+from collections import OrderedDict, deque
+from typing import Deque, List, Dict, Optional, Tuple
 from bot.database.base import DatabaseInterface
 from bot.database.models import ConversationMessage
 
 logger = logging.getLogger(__name__)
 
 
+def _estimate_tokens(text: str) -> int:
+    """Estime grossièrement le nombre de tokens d'un texte (~4 caractères par token)"""
+    return len(text) // 4 + 1
+
+
+def _to_api(message: ConversationMessage) -> Dict[str, str]:
+    """Convertit un message DB au format API Mistral"""
+    return {"role": message.role, "content": message.content}
+
+
 class ConversationManager:
     """Gestionnaire de l'historique de conversation pour l'IA"""
     
-    def __init__(self, database: DatabaseInterface, max_history: int = 50):
+    # Nombre maximum de canaux dont l'historique récent est gardé en mémoire
+    MAX_CACHED_CHANNELS = 256
+    
+    # Écriture différée : délai avant écriture groupée et taille déclenchant une écriture immédiate
+    FLUSH_DELAY = 0.2
+    FLUSH_BATCH_SIZE = 50
+    
+    def __init__(
+        self,
+        database: DatabaseInterface,
+        max_history: int = 50,
+        token_budget: int = 4096
+    ):
         """
         Initialise le gestionnaire de conversation
         
         Args:
             database: Instance de la base de données
             max_history: Nombre maximum de messages à conserver
+            token_budget: Nombre approximatif de tokens d'historique envoyés à l'API
         """
         self.db = database
         self.max_history = max_history
-        logger.info(f"ConversationManager initialisé (max_history={max_history})")
+        self.token_budget = token_budget
+        # (guild_id, channel_id) -> derniers messages (au plus max_history), LRU
+        self._hist_cache: OrderedDict[Tuple[int, int], Deque[ConversationMessage]] = OrderedDict()
+        # Messages en attente d'écriture en base
+        self._pending: List[ConversationMessage] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        logger.info("ConversationManager initialisé (max_history=%d, token_budget=%d)", max_history, token_budget)
     
     async def get_history(
         self,
         guild_id: int,
         channel_id: int,
-        limit: int = None
+        limit: int = None,
+        token_budget: int = None
     ) -> List[ConversationMessage]:
         """
         Récupère l'historique de conversation pour un canal
         
+        Les messages les plus anciens sont écartés dès que le budget de tokens
+        est dépassé, le coût d'un prompt dépendant de sa taille et non du
+        nombre de messages.
+        
         Args:
             guild_id: ID du serveur Discord
             channel_id: ID du canal Discord
             limit: Nombre de messages à récupérer (par défaut: max_history)
+            token_budget: Budget de tokens de l'historique (par défaut: token_budget)
             
         Returns:
             Liste des messages (du plus ancien au plus récent)
         """
         if limit is None:
             limit = self.max_history
+        if token_budget is None:
+            token_budget = self.token_budget
+        
+        if limit <= self.max_history:
+            messages = await self._get_cached_history(guild_id, channel_id)
+            messages = messages[-limit:] if limit > 0 else []
+        else:
+            await self.flush()
+            messages = await self.db.get_conversation_history(guild_id, channel_id, limit)
         
-        messages = await self.db.get_conversation_history(guild_id, channel_id, limit)
-        logger.debug(f"Récupéré {len(messages)} message(s) pour channel {channel_id}")
+        # Conserver les messages les plus récents qui tiennent dans le budget
+        used = 0
+        start = len(messages)
+        while start > 0:
+            used += _estimate_tokens(messages[start - 1].content)
+            if used > token_budget:
+                break
+            start -= 1
+        messages = messages[start:]
+        
+        logger.debug("Récupéré %d message(s) pour channel %s (~%d tokens)", len(messages), channel_id, used)
         
         return messages
     
+    async def get_api_messages(
+        self,
+        guild_id: int,
+        channel_id: int,
+        limit: int = None
+    ) -> List[Dict[str, str]]:
+        """
+        Récupère l'historique d'un canal directement au format API Mistral
+        
+        Args:
+            guild_id: ID du serveur Discord
+            channel_id: ID du canal Discord
+            limit: Nombre de messages à récupérer (par défaut: max_history)
+            
+        Returns:
+            Liste de messages {"role", "content"} (du plus ancien au plus récent)
+        """
+        return self.format_for_api(await self.get_history(guild_id, channel_id, limit))
+    
+    async def _get_cached_history(self, guild_id: int, channel_id: int) -> List[ConversationMessage]:
+        """
+        Retourne les max_history derniers messages d'un canal depuis la mémoire
+        
+        Le cache est chargé depuis la base de données au premier accès.
+        
+        Args:
+            guild_id: ID du serveur Discord
+            channel_id: ID du canal Discord
+            
+        Returns:
+            Liste des messages (du plus ancien au plus récent)
+        """
+        key = (guild_id, channel_id)
+        cached = self._hist_cache.get(key)
+        
+        if cached is None:
+            # Verrou tenu pendant la lecture : un message est soit en base, soit en attente
+            async with self._flush_lock:
+                await self._write_pending()
+                messages = await self.db.get_conversation_history(guild_id, channel_id, self.max_history)
+                # Messages ajoutés pendant la lecture
+                messages.extend(
+                    m for m in self._pending
+                    if m.guild_id == guild_id and m.channel_id == channel_id
+                )
+            cached = deque(messages, maxlen=self.max_history)
+            self._hist_cache[key] = cached
+            
+            while len(self._hist_cache) > self.MAX_CACHED_CHANNELS:
+                self._hist_cache.popitem(last=False)
+        else:
+            self._hist_cache.move_to_end(key)
+        
+        return list(cached)
+    
     async def add_message(
         self,
         guild_id: int,
@@ -66,8 +177,11 @@ class ConversationManager:
             role: Rôle du message ('user', 'assistant', 'system')
             content: Contenu du message
             
+        L'écriture en base est différée et groupée avec les messages suivants
+        (voir flush) ; le message est immédiatement visible dans l'historique.
+        
         Returns:
-            Message sauvegardé
+            Message ajouté (son ID est attribué lors de l'écriture en base)
         """
         message = ConversationMessage(
             id=None,
@@ -78,10 +192,105 @@ class ConversationManager:
             content=content
         )
         
-        saved_message = await self.db.save_message(message)
-        logger.debug(f"Message ajouté: {role} dans channel {channel_id}")
+        await self._enqueue(message)
+        logger.debug("Message ajouté: %s dans channel %s", role, channel_id)
         
-        return saved_message
+        return message
+    
+    async def add_exchange(
+        self,
+        guild_id: int,
+        channel_id: int,
+        user_id: int,
+        bot_id: int,
+        user_content: str,
+        assistant_content: str
+    ) -> Tuple[ConversationMessage, ConversationMessage]:
+        """
+        Ajoute une question et la réponse de l'IA à l'historique
+        
+        Les deux messages partent dans le même lot d'écriture, donc dans une
+        seule transaction.
+        
+        Args:
+            guild_id: ID du serveur Discord
+            channel_id: ID du canal Discord
+            user_id: ID de l'utilisateur ayant posé la question
+            bot_id: ID du bot (auteur de la réponse)
+            user_content: Contenu du message de l'utilisateur
+            assistant_content: Contenu de la réponse
+            
+        Returns:
+            Messages ajoutés (question, réponse)
+        """
+        user_message = ConversationMessage(
+            id=None,
+            guild_id=guild_id,
+            channel_id=channel_id,
+            user_id=user_id,
+            role="user",
+            content=user_content
+        )
+        assistant_message = ConversationMessage(
+            id=None,
+            guild_id=guild_id,
+            channel_id=channel_id,
+            user_id=bot_id,
+            role="assistant",
+            content=assistant_content
+        )
+        
+        await self._enqueue(user_message, assistant_message)
+        logger.debug("Échange ajouté dans channel %s", channel_id)
+        
+        return user_message, assistant_message
+    
+    async def _enqueue(self, *messages: ConversationMessage) -> None:
+        """
+        Met des messages en attente d'écriture et les ajoute au cache
+        
+        Args:
+            messages: Messages d'un même canal, dans l'ordre
+        """
+        self._pending.extend(messages)
+        
+        # Le cache n'est alimenté que s'il est déjà chargé (sinon il serait incomplet).
+        # Mis à jour avant toute attente : un chargement du cache pendant l'écriture
+        # lirait ces messages en base et ne doit pas les voir ajoutés une seconde fois
+        cached = self._hist_cache.get((messages[0].guild_id, messages[0].channel_id))
+        if cached is not None:
+            cached.extend(messages)
+        
+        if len(self._pending) >= self.FLUSH_BATCH_SIZE:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+    
+    async def flush(self) -> None:
+        """Écrit en base tous les messages en attente"""
+        async with self._flush_lock:
+            await self._write_pending()
+    
+    async def _write_pending(self) -> None:
+        """Écrit les messages en attente en une seule transaction (verrou requis)"""
+        if not self._pending:
+            return
+        
+        batch, self._pending = self._pending, []
+        try:
+            await self.db.save_messages(batch)
+            logger.debug("%d message(s) écrit(s) en base", len(batch))
+        except Exception as e:
+            logger.error("Erreur lors de l'écriture de l'historique (%d message(s) perdus): %s", len(batch), e)
+            # Les caches des canaux concernés contiennent des messages absents de la base :
+            # ils seront rechargés depuis la base au prochain accès
+            for key in {(message.guild_id, message.channel_id) for message in batch}:
+                self._hist_cache.pop(key, None)
+    
+    async def _delayed_flush(self) -> None:
+        """Regroupe les messages ajoutés pendant FLUSH_DELAY puis les écrit"""
+        await asyncio.sleep(self.FLUSH_DELAY)
+        await self.flush()
     
     async def clear_history(self, guild_id: int, channel_id: int) -> bool:
         """
@@ -94,10 +303,12 @@ class ConversationManager:
         Returns:
             True si effacement réussi
         """
+        await self.flush()
         success = await self.db.clear_conversation_history(guild_id, channel_id)
+        self._hist_cache.pop((guild_id, channel_id), None)
         
         if success:
-            logger.info(f"Historique effacé pour channel {channel_id}")
+            logger.info("Historique effacé pour channel %s", channel_id)
         
         return success
     
@@ -111,7 +322,7 @@ class ConversationManager:
         Returns:
             Liste formatée pour l'API
         """
-        return [msg.to_api_format() for msg in messages]
+        return list(map(_to_api, messages))
     
     async def prune_old_messages(
         self,
@@ -133,18 +344,17 @@ class ConversationManager:
         if keep_count is None:
             keep_count = self.max_history
         
-        # Récupérer tous les messages
-        all_messages = await self.db.get_conversation_history(
-            guild_id, 
-            channel_id, 
-            limit=10000  # Grande limite pour tout récupérer
-        )
+        await self.flush()
+        
+        # Rien à supprimer : éviter le DELETE
+        if await self.db.count_conversation_history(guild_id, channel_id) <= keep_count:
+            return 0
+        
+        deleted = await self.db.prune_conversation_history(guild_id, channel_id, keep_count)
+        if deleted:
+            self._hist_cache.pop((guild_id, channel_id), None)
         
-        # Si on dépasse la limite, supprimer les plus anciens
-        if len(all_messages) > keep_count:
-            # Pour simplifier, on efface tout et on recrée les plus récents
-            # Dans une vraie implémentation, on ferait une requête DELETE avec LIMIT
-            logger.info(f"Élagage de l'historique: {len(all_messages)} -> {keep_count} messages")
-            return len(all_messages) - keep_count
+        if deleted:
+            logger.info("Élagage de l'historique: %d message(s) supprimé(s) dans channel %s", deleted, channel_id)
         
-        return 0
+        return deleted
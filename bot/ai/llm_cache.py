@@ -0,0 +1,179 @@
+"""Cache des réponses LLM (correspondance exacte + similarité sémantique)"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """Cache LRU en mémoire pour les réponses de l'API Mistral"""
+
+    def __init__(self, max_size: int = 1024, similarity_threshold: float = 0.92):
+        """
+        Initialise le cache
+
+        Args:
+            max_size: Nombre maximum de réponses conservées
+            similarity_threshold: Similarité cosinus minimale pour un hit sémantique
+        """
+        self.max_size = max_size
+        self.similarity_threshold = similarity_threshold
+        # clé -> réponse
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        # clé -> (namespace, embedding normalisé)
+        self._embeddings: Dict[str, Tuple[str, np.ndarray]] = {}
+        # namespace -> (clés, matrice des embeddings normalisés), reconstruite à la demande
+        self._matrices: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def cache_key(model: str, messages: List[Dict[str, str]], temperature: float) -> str:
+        """
+        Calcule la clé de cache d'une requête
+
+        Args:
+            model: Modèle utilisé
+            messages: Messages envoyés (prompt système inclus)
+            temperature: Température de génération
+
+        Returns:
+            Empreinte SHA-256 hexadécimale
+        """
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Récupère une réponse par correspondance exacte
+
+        Un échec n'est pas compté ici : l'appelant peut encore trouver une
+        réponse avec get_similar, puis appelle record_miss s'il n'en trouve pas.
+
+        Args:
+            key: Clé calculée par cache_key
+
+        Returns:
+            Réponse en cache ou None
+        """
+        response = self._entries.get(key)
+        if response is None:
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return response
+
+    async def get_similar(self, namespace: str, embedding: List[float]) -> Optional[str]:
+        """
+        Récupère la réponse la plus proche sémantiquement
+
+        Args:
+            namespace: Espace de recherche (serveur + modèle + prompt système)
+            embedding: Embedding du prompt
+
+        Returns:
+            Réponse en cache si la similarité dépasse le seuil, sinon None
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+
+        matrix = self._matrix(namespace)
+        if matrix is None:
+            return None
+
+        # Similarité cosinus avec toutes les entrées du namespace en un seul produit
+        keys, vectors = matrix
+        scores = vectors @ query
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+        if best_score < self.similarity_threshold:
+            return None
+
+        best_key = keys[best]
+        self._entries.move_to_end(best_key)
+        self.stats["semantic_hits"] += 1
+        logger.debug("Hit sémantique (similarité %.3f)", best_score)
+        return self._entries[best_key]
+
+    async def set(
+        self,
+        key: str,
+        response: str,
+        namespace: Optional[str] = None,
+        embedding: Optional[List[float]] = None
+    ) -> None:
+        """
+        Ajoute une réponse au cache
+
+        Args:
+            key: Clé calculée par cache_key
+            response: Réponse de l'API
+            namespace: Espace de recherche sémantique (optionnel)
+            embedding: Embedding du prompt (optionnel)
+        """
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+
+        if namespace is not None and embedding is not None:
+            vector = self._normalize(embedding)
+            if vector is not None:
+                self._embeddings[key] = (namespace, vector)
+                self._matrices.pop(namespace, None)
+
+        while len(self._entries) > self.max_size:
+            evicted_key, _ = self._entries.popitem(last=False)
+            evicted = self._embeddings.pop(evicted_key, None)
+            if evicted is not None:
+                self._matrices.pop(evicted[0], None)
+            self.stats["evictions"] += 1
+
+    def record_miss(self) -> None:
+        """Compte une requête pour laquelle aucune réponse n'a été trouvée en cache"""
+        self.stats["misses"] += 1
+
+    def clear(self) -> None:
+        """Vide le cache"""
+        self._entries.clear()
+        self._embeddings.clear()
+        self._matrices.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _matrix(self, namespace: str) -> Optional[Tuple[List[str], np.ndarray]]:
+        """
+        Récupère la matrice des embeddings d'un namespace
+
+        Args:
+            namespace: Espace de recherche
+
+        Returns:
+            Clés et matrice (une ligne par clé), ou None si le namespace est vide
+        """
+        matrix = self._matrices.get(namespace)
+        if matrix is None:
+            keys = [key for key, (entry_namespace, _) in self._embeddings.items() if entry_namespace == namespace]
+            if not keys:
+                return None
+            matrix = (keys, np.stack([self._embeddings[key][1] for key in keys]))
+            self._matrices[namespace] = matrix
+        return matrix
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> Optional[np.ndarray]:
+        """Convertit un vecteur en float32 de norme 1 (None si nul)"""
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        if norm == 0:
+            return None
+        return array / norm
@@ -1,17 +1,37 @@
 """Client wrapper pour l'API Mistral AI"""
 
+import asyncio
+import functools
+import hashlib
 import logging
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
+import httpx
 from mistralai import Mistral
 
 from bot.config import Config
+from bot.ai.llm_cache import LLMCache
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=256)
+def _system_message(system_prompt: str) -> Dict[str, str]:
+    """Message système d'un prompt, construit une fois par prompt (ne pas modifier)"""
+    return {"role": "system", "content": system_prompt}
+
+
+@functools.lru_cache(maxsize=256)
+def _semantic_namespace(guild_id: Optional[int], model: str, system_prompt: Optional[str]) -> str:
+    """Empreinte de l'espace du cache sémantique (serveur + modèle + prompt système)"""
+    return hashlib.sha256(f"{guild_id}\n{model}\n{system_prompt or ''}".encode()).hexdigest()
+
+
 class MistralClient:
     """Wrapper pour l'API Mistral AI"""
     
+    # Durée de conservation d'une connexion inactive vers l'API (en secondes)
+    KEEPALIVE_EXPIRY = 60
+    
     def __init__(
         self,
         api_key: str = None,
@@ -31,25 +51,64 @@ class MistralClient:
         self.api_key = api_key or Config.MISTRAL_API_KEY
         self.model = model or Config.MISTRAL_MODEL
         self.max_tokens = max_tokens or Config.MISTRAL_MAX_TOKENS
-        self.temperature = temperature or Config.MISTRAL_TEMPERATURE
+        self.temperature = temperature if temperature is not None else Config.MISTRAL_TEMPERATURE
         
         if not self.api_key:
             raise ValueError("Clé API Mistral manquante")
         
-        self.client = Mistral(api_key=self.api_key)
-        logger.info(f"Client Mistral initialisé avec le modèle: {self.model}")
+        # Pool de connexions HTTP unique pour toute la durée de vie du client :
+        # les connexions TLS vers l'API restent ouvertes entre deux appels
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.MISTRAL_MAX_CONCURRENT_REQUESTS,
+                max_keepalive_connections=Config.MISTRAL_MAX_CONCURRENT_REQUESTS,
+                keepalive_expiry=self.KEEPALIVE_EXPIRY
+            )
+        )
+        self.client = Mistral(api_key=self.api_key, async_client=self._http)
+        
+        # Cache des réponses, activé explicitement par MISTRAL_CACHE_ENABLED (None sinon)
+        self.cache: Optional[LLMCache] = None
+        if Config.MISTRAL_CACHE_ENABLED:
+            self.cache = LLMCache(
+                max_size=Config.MISTRAL_CACHE_SIZE,
+                similarity_threshold=Config.MISTRAL_SEMANTIC_CACHE_THRESHOLD
+            )
+            if self.temperature != 0:
+                logger.warning(
+                    "Cache Mistral actif avec une température de %s : une conversation "
+                    "identique reçoit la réponse en cache au lieu d'une nouvelle génération",
+                    self.temperature
+                )
+        self.semantic_cache = Config.MISTRAL_SEMANTIC_CACHE
+        
+        # Requêtes identiques en cours (clé de cache -> tâche partagée par les appelants)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Limite les appels simultanés à l'API, chat et embeddings confondus (évite les 429)
+        self._request_slots = asyncio.Semaphore(Config.MISTRAL_MAX_CONCURRENT_REQUESTS)
+        logger.info("Client Mistral initialisé avec le modèle: %s", self.model)
+    
+    async def close(self) -> None:
+        """Ferme le pool de connexions HTTP"""
+        await self._http.aclose()
     
     async def chat_completion(
         self,
         messages: List[Dict[str, str]],
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        guild_id: Optional[int] = None
     ) -> str:
         """
         Envoie une requête de chat completion à Mistral
         
+        Le prompt système est toujours placé en premier et l'historique n'est
+        jamais modifié : le début du prompt reste identique d'un tour à l'autre,
+        ce qui permet au fournisseur de réutiliser son cache de préfixe.
+        
         Args:
             messages: Liste des messages de conversation
             system_prompt: Prompt système optionnel
+            guild_id: Serveur d'origine (le cache sémantique est propre à chaque serveur)
             
         Returns:
             Réponse de l'IA
@@ -58,47 +117,234 @@ class MistralClient:
             Exception: En cas d'erreur API
         """
         try:
-            # Ajouter le prompt système si fourni
-            if system_prompt:
-                messages = [
-                    {"role": "system", "content": system_prompt},
-                    *messages
-                ]
+            messages = self._build_messages(messages, system_prompt)
+            
+            # Vérifier le cache (seulement s'il est activé)
+            use_cache = self.cache is not None
+            cache_key = None
+            namespace = None
+            embedding = None
+            
+            if use_cache:
+                cache_key = LLMCache.cache_key(self.model, messages, self.temperature)
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    logger.debug("Réponse servie depuis le cache")
+                    return cached
+                
+                if self.semantic_cache:
+                    namespace = _semantic_namespace(guild_id, self.model, system_prompt)
+                    embedding = await self._embed(messages)
+                    if embedding is not None:
+                        cached = await self.cache.get_similar(namespace, embedding)
+                        if cached is not None:
+                            logger.debug("Réponse servie depuis le cache sémantique")
+                            return cached
+                
+                self.cache.record_miss()
+                
+                # Une requête identique est déjà en cours : attendre sa réponse
+                # plutôt que d'envoyer un second appel
+                request = self._inflight.get(cache_key)
+                if request is None:
+                    request = asyncio.create_task(
+                        self._complete_and_cache(messages, cache_key, namespace, embedding)
+                    )
+                    self._inflight[cache_key] = request
+                    request.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+                else:
+                    logger.debug("Requête identique en cours, réponse partagée")
+                
+                # Protégée : l'annulation d'un appelant n'interrompt pas les autres
+                return await asyncio.shield(request)
+            
+            return await self._complete(messages)
+            
+        except Exception as e:
+            logger.error("Erreur lors de l'appel à l'API Mistral: %s", e)
+            raise
+    
+    async def chat_completion_stream(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        guild_id: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Envoie une requête de chat completion et renvoie la réponse au fil de l'eau
+        
+        Quand le cache est activé, la réponse est produite en un seul morceau
+        par chat_completion, pour profiter du cache et du partage des requêtes
+        identiques.
+        
+        Args:
+            messages: Liste des messages de conversation
+            system_prompt: Prompt système optionnel
+            guild_id: Serveur d'origine (le cache sémantique est propre à chaque serveur)
+            
+        Yields:
+            Morceaux successifs de la réponse
+            
+        Raises:
+            Exception: En cas d'erreur API
+        """
+        if self.cache is not None:
+            yield await self.chat_completion(messages, system_prompt, guild_id)
+            return
+        
+        try:
+            messages = self._build_messages(messages, system_prompt)
+            logger.debug("Envoi de %d message(s) à Mistral (streaming)", len(messages))
+            
+            received = 0
+            async with self._request_slots:
+                stream = await self.client.chat.stream_async(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature
+                )
+                async for event in stream:
+                    if not event.data.choices:
+                        continue
+                    content = event.data.choices[0].delta.content
+                    if isinstance(content, str) and content:
+                        received += len(content)
+                        yield content
+            
+            if not received:
+                logger.error("Réponse vide de l'API Mistral")
+                raise ValueError("Réponse vide de l'API")
+            logger.debug("Réponse reçue: %d caractères", received)
+            
+        except Exception as e:
+            logger.error("Erreur lors de l'appel à l'API Mistral: %s", e)
+            raise
+    
+    async def _complete(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Appelle l'API Mistral sans bloquer la boucle d'événements
+        
+        Args:
+            messages: Messages à envoyer (prompt système inclus)
             
-            logger.debug(f"Envoi de {len(messages)} message(s) à Mistral")
+        Returns:
+            Réponse de l'IA
             
-            # Appel à l'API Mistral
-            response = self.client.chat.complete(
+        Raises:
+            ValueError: Si l'API renvoie une réponse vide
+        """
+        logger.debug("Envoi de %d message(s) à Mistral", len(messages))
+        
+        async with self._request_slots:
+            response = await self.client.chat.complete_async(
                 model=self.model,
                 messages=messages,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature
             )
+        
+        # Extraire la réponse
+        if response and response.choices and len(response.choices) > 0:
+            content = response.choices[0].message.content
+            logger.debug("Réponse reçue: %d caractères", len(content))
+            return content
+        
+        logger.error("Réponse vide de l'API Mistral")
+        raise ValueError("Réponse vide de l'API")
+    
+    async def _complete_and_cache(
+        self,
+        messages: List[Dict[str, str]],
+        cache_key: str,
+        namespace: Optional[str],
+        embedding: Optional[List[float]]
+    ) -> str:
+        """
+        Appelle l'API puis met la réponse en cache
+        
+        Args:
+            messages: Messages à envoyer (prompt système inclus)
+            cache_key: Clé de cache exacte de la requête
+            namespace: Espace du cache sémantique (ou None)
+            embedding: Embedding du prompt (ou None)
             
-            # Extraire la réponse
-            if response and response.choices and len(response.choices) > 0:
-                content = response.choices[0].message.content
-                logger.debug(f"Réponse reçue: {len(content)} caractères")
-                return content
-            else:
-                logger.error("Réponse vide de l'API Mistral")
-                raise ValueError("Réponse vide de l'API")
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de l'appel à l'API Mistral: {e}")
-            raise
+        Returns:
+            Réponse de l'IA
+        """
+        content = await self._complete(messages)
+        await self.cache.set(cache_key, content, namespace, embedding)
+        return content
     
-    def format_conversation_history(
+    def _build_messages(
         self,
-        messages: List
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str]
     ) -> List[Dict[str, str]]:
         """
-        Formate l'historique de conversation pour l'API
+        Construit la liste de messages envoyée à l'API
         
         Args:
-            messages: Liste de ConversationMessage
+            messages: Liste des messages de conversation
+            system_prompt: Prompt système optionnel
+            
+        Returns:
+            Messages dédupliqués, précédés du prompt système
+        """
+        messages = self._deduplicate(messages)
+        
+        # Ajouter le prompt système si fourni (nouvelle liste, l'historique reste intact)
+        if system_prompt:
+            messages = [_system_message(system_prompt), *messages]
+        return messages
+    
+    @staticmethod
+    def _deduplicate(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Fusionne les messages répétés à l'identique consécutivement
+        
+        Seules les répétitions immédiates (même rôle, même contenu) sont
+        retirées : un « ok » ou un « merci » plus ancien reste à sa place, et
+        retirer une copie d'une répétition ne met jamais côte à côte deux
+        messages de même rôle qui ne l'étaient pas déjà.
+        
+        Args:
+            messages: Liste des messages de conversation
             
         Returns:
-            Liste formatée pour l'API Mistral
+            Liste sans répétitions consécutives, dans l'ordre d'origine
         """
-        return [msg.to_api_format() for msg in messages]
+        deduplicated = []
+        previous = None
+        for message in messages:
+            key = (message["role"], message["content"])
+            if key != previous:
+                deduplicated.append(message)
+                previous = key
+        
+        if len(deduplicated) < len(messages):
+            logger.debug("%d message(s) dupliqué(s) retiré(s)", len(messages) - len(deduplicated))
+        
+        return deduplicated
+    
+    async def _embed(self, messages: List[Dict[str, str]]) -> Optional[List[float]]:
+        """
+        Calcule l'embedding d'une conversation pour le cache sémantique
+        
+        Args:
+            messages: Messages de la conversation (hors prompt système)
+            
+        Returns:
+            Vecteur d'embedding ou None en cas d'erreur
+        """
+        text = "\n".join(msg["content"] for msg in messages if msg["role"] != "system")
+        try:
+            async with self._request_slots:
+                response = await self.client.embeddings.create_async(
+                    model=Config.MISTRAL_EMBED_MODEL,
+                    inputs=[text]
+                )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning("Impossible de calculer l'embedding pour le cache: %s", e)
+            return None
@@ -1,7 +1,9 @@
 """Gestionnaire de templates IA"""
 
 import logging
-from typing import Optional, List
+import sys
+import time
+from typing import Dict, Optional, List, Tuple
 from bot.database.base import DatabaseInterface
 from bot.database.models import AITemplate
 
@@ -20,6 +22,13 @@ Adapte ton ton à la conversation et reste respectueux."""
 Fais attention à qui parle et utilise les pseudos pour t'adresser aux utilisateurs de manière personnalisée.
 Dans les conversations multi-utilisateurs, distingue clairement les différents interlocuteurs."""
     
+    # Prompt par défaut complet, construit une seule fois pour rester identique
+    # d'un appel à l'autre (réutilisation du cache de préfixe côté fournisseur)
+    DEFAULT_PROMPT = sys.intern(DEFAULT_TEMPLATE + "\n\n" + RULES)
+    
+    # Durée de validité du cache des templates (en secondes)
+    CACHE_TTL = 300
+    
     def __init__(self, database: DatabaseInterface):
         """
         Initialise le gestionnaire de templates
@@ -28,6 +37,10 @@ Dans les conversations multi-utilisateurs, distingue clairement les différents
             database: Instance de la base de données
         """
         self.db = database
+        # guild_id -> (prompt système complet, timestamp d'insertion)
+        self._active_cache: Dict[int, Tuple[str, float]] = {}
+        # guild_id -> (templates du serveur, timestamp d'insertion)
+        self._list_cache: Dict[int, Tuple[List[AITemplate], float]] = {}
         logger.info("TemplateManager initialisé")
     
     async def get_active_template(self, guild_id: int) -> str:
@@ -40,14 +53,32 @@ Dans les conversations multi-utilisateurs, distingue clairement les différents
         Returns:
             Prompt système (template actif ou défaut)
         """
+        cached = self._active_cache.get(guild_id)
+        if cached and time.monotonic() - cached[1] < self.CACHE_TTL:
+            return cached[0]
+        
         template = await self.db.get_active_template(guild_id)
         
         if template:
-            logger.debug(f"Template actif trouvé pour guild {guild_id}: {template.name}")
-            return template.system_prompt + "\n\n" + self.RULES
+            logger.debug("Template actif trouvé pour guild %s: %s", guild_id, template.name)
+            # Interné : deux serveurs avec le même template partagent la même chaîne
+            prompt = sys.intern(template.system_prompt + "\n\n" + self.RULES)
         else:
-            logger.debug(f"Aucun template actif pour guild {guild_id}, utilisation du défaut")
-            return self.DEFAULT_TEMPLATE + "\n\n" + self.RULES
+            logger.debug("Aucun template actif pour guild %s, utilisation du défaut", guild_id)
+            prompt = self.DEFAULT_PROMPT
+        
+        self._active_cache[guild_id] = (prompt, time.monotonic())
+        return prompt
+    
+    def invalidate_cache(self, guild_id: int) -> None:
+        """
+        Invalide les templates en cache pour un serveur
+        
+        Args:
+            guild_id: ID du serveur Discord
+        """
+        self._active_cache.pop(guild_id, None)
+        self._list_cache.pop(guild_id, None)
     
     async def create_template(
         self,
@@ -80,6 +111,7 @@ Dans les conversations multi-utilisateurs, distingue clairement les différents
         )
         
         saved_template = await self.db.save_template(template)
+        self.invalidate_cache(guild_id)
         logger.info(f"Template créé: {name} pour guild {guild_id}")
         
         if set_active:
@@ -101,21 +133,19 @@ Dans les conversations multi-utilisateurs, distingue clairement les différents
             
         Returns:
             Template mis à jour
+            
+        Raises:
+            ValueError: Si le template n'existe pas
         """
         # Récupérer le template existant
-        templates = await self.db.get_all_templates(0)  # On va le chercher différemment
-        template = None
-        
-        for t in templates:
-            if t.id == template_id:
-                template = t
-                break
+        template = await self.db.get_template_by_id(template_id)
         
         if not template:
             raise ValueError(f"Template {template_id} non trouvé")
         
         template.system_prompt = system_prompt
         updated = await self.db.save_template(template)
+        self.invalidate_cache(template.guild_id)
         
         logger.info(f"Template {template_id} mis à jour")
         return updated
@@ -130,9 +160,12 @@ Dans les conversations multi-utilisateurs, distingue clairement les différents
         Returns:
             True si suppression réussie
         """
+        template = await self.db.get_template_by_id(template_id)
         success = await self.db.delete_template(template_id)
         
         if success:
+            if template:
+                self.invalidate_cache(template.guild_id)
             logger.info(f"Template {template_id} supprimé")
         
         return success
@@ -149,6 +182,7 @@ Dans les conversations multi-utilisateurs, distingue clairement les différents
             True si activation réussie
         """
         success = await self.db.set_active_template(guild_id, template_id)
+        self.invalidate_cache(guild_id)
         
         if success:
             logger.info(f"Template {template_id} activé pour guild {guild_id}")
@@ -165,9 +199,28 @@ Dans les conversations multi-utilisateurs, distingue clairement les différents
         Returns:
             Liste des templates
         """
+        cached = self._list_cache.get(guild_id)
+        if cached and time.monotonic() - cached[1] < self.CACHE_TTL:
+            return list(cached[0])
+        
         templates = await self.db.get_all_templates(guild_id)
-        logger.debug(f"{len(templates)} template(s) trouvé(s) pour guild {guild_id}")
-        return templates
+        logger.debug("%d template(s) trouvé(s) pour guild %s", len(templates), guild_id)
+        
+        self._list_cache[guild_id] = (templates, time.monotonic())
+        return list(templates)
+    
+    async def get_by_name(self, guild_id: int, name: str) -> Optional[AITemplate]:
+        """
+        Récupère un template d'un serveur par son nom
+        
+        Args:
+            guild_id: ID du serveur
+            name: Nom du template
+            
+        Returns:
+            Template ou None si non trouvé
+        """
+        return await self.db.get_template_by_name(guild_id, name)
     
     def get_default_template(self) -> str:
         """
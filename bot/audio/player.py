@@ -3,7 +3,7 @@
 import asyncio
 import logging
 import time
-from typing import Optional
+from typing import Callable, List, Optional, Set
 import discord
 
 from bot.audio.track import Track
@@ -23,6 +23,9 @@ logger = logging.getLogger(__name__)
 class MusicPlayer:
     """Gestionnaire audio pour un serveur Discord"""
     
+    # Délai avant la libération d'une source remplacée (le thread audio lit une trame toutes les 20 ms)
+    SOURCE_CLEANUP_DELAY = 1.0
+    
     def __init__(self, bot, guild: discord.Guild):
         """
         Initialise le player pour un serveur
@@ -39,15 +42,25 @@ class MusicPlayer:
         self.volume: float = Config.DEFAULT_VOLUME
         self.loop: bool = False
         self._player_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._is_playing = False
         self._skip_requested = False
-        self.youtube_source = YouTubeSource()
-        self.spotify_source = SpotifySource()
+        self.youtube_source: YouTubeSource = bot.youtube_source
+        self.spotify_source: SpotifySource = bot.spotify_source
+        # URL du stream en cours (pour recréer la source lors d'un changement de volume)
+        self._stream_url: Optional[str] = None
+        # Préchargement de l'URL du stream de la piste suivante
+        self._prefetch_track: Optional[Track] = None
+        self._prefetch_task: Optional[asyncio.Task] = None
+        # Tous les préchargements en cours, y compris ceux devenus inutiles
+        self._prefetch_tasks: Set[asyncio.Task] = set()
+        # Horodatages en time.monotonic() (insensible aux ajustements de l'horloge système)
         # Position tracking for pause/resume
         self._playback_start_time: Optional[float] = None
         self._pause_position: float = 0.0
-        # Activity tracking for auto-disconnect
-        self._last_activity_time: Optional[float] = time.time()
+        # Déconnexion automatique : minuterie armée tant que le player est inactif
+        self._inactivity_handle: Optional[asyncio.TimerHandle] = None
+        self._inactivity_task: Optional[asyncio.Task] = None
     
     async def connect(self, channel: discord.VoiceChannel, timeout: int = None) -> bool:
         """
@@ -74,10 +87,17 @@ class MusicPlayer:
                     timeout=timeout
                 )
             else:
-                self.voice_client = await asyncio.wait_for(
-                    channel.connect(),
-                    timeout=timeout
-                )
+                # shield : au timeout, la connexion en cours est annulée puis
+                # fermée explicitement au lieu de laisser un websocket orphelin
+                connect_task = asyncio.create_task(channel.connect())
+                try:
+                    self.voice_client = await asyncio.wait_for(
+                        asyncio.shield(connect_task),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    await self._discard_connection(connect_task)
+                    raise
             
             logger.info(f"Connecté au canal vocal: {channel.name} ({self.guild.name})")
             
@@ -97,6 +117,22 @@ class MusicPlayer:
             logger.error(f"Erreur lors de la connexion au canal vocal: {e}")
             return False
     
+    @staticmethod
+    async def _discard_connection(connect_task: asyncio.Task) -> None:
+        """
+        Annule une connexion vocale abandonnée et ferme le client s'il a été créé
+        
+        Args:
+            connect_task: Tâche exécutant channel.connect()
+        """
+        connect_task.cancel()
+        try:
+            voice_client = await connect_task
+        except (asyncio.CancelledError, Exception):
+            return
+        # La connexion a abouti entre le timeout et l'annulation
+        await voice_client.disconnect(force=True)
+    
     async def disconnect(self) -> None:
         """Déconnecte le bot du canal vocal et nettoie les ressources"""
         try:
@@ -119,11 +155,16 @@ class MusicPlayer:
             
             # Nettoyer la queue et réinitialiser l'état
             await self.queue.clear()
+            self._cancel_prefetch()
+            self._cancel_inactivity_timer()
             self.current = None
             self._is_playing = False
             self._playback_start_time = None
             self._pause_position = 0.0
-            self._last_activity_time = None
+            self._stream_url = None
+            
+            # Libérer le player : un nouveau sera créé à la prochaine commande
+            self.bot.release_player(self)
             
             logger.info(f"Déconnecté du canal vocal ({self.guild.name})")
             
@@ -142,12 +183,32 @@ class MusicPlayer:
         """
         position = await self.queue.add(track)
         self._update_activity()
+        if self._is_playing:
+            self._start_prefetch()
         logger.info(f"Piste ajoutée: {track.title} (position {position})")
         return position
     
+    async def add_tracks(self, tracks: List[Track]) -> int:
+        """
+        Ajoute plusieurs pistes à la queue (playlists, albums)
+        
+        Args:
+            tracks: Pistes à ajouter
+            
+        Returns:
+            Position de la première piste dans la queue
+        """
+        position = await self.queue.add_many(tracks)
+        self._update_activity()
+        if self._is_playing:
+            self._start_prefetch()
+        logger.info(f"{len(tracks)} piste(s) ajoutée(s) (à partir de la position {position})")
+        return position
+    
     async def stop(self) -> None:
         """Arrête la lecture et vide la queue"""
         await self.queue.clear()
+        self._cancel_prefetch()
         if self.voice_client and self.voice_client.is_playing():
             self.voice_client.stop()
         self.current = None
@@ -155,13 +216,20 @@ class MusicPlayer:
         # Réinitialiser le suivi de position
         self._playback_start_time = None
         self._pause_position = 0.0
+        self._stream_url = None
         logger.info("Lecture arrêtée")
     
-    async def clear_queue(self) -> None:
-        """Vide la queue sans arrêter la lecture en cours"""
-        await self.queue.clear()
+    async def clear_queue(self) -> int:
+        """
+        Vide la queue sans arrêter la lecture en cours
+        
+        Returns:
+            Nombre de pistes retirées
+        """
+        removed = await self.queue.clear()
         self._update_activity()
         logger.info("Queue vidée")
+        return removed
     
     async def pause(self) -> bool:
         """
@@ -173,7 +241,7 @@ class MusicPlayer:
         if self.voice_client and self.voice_client.is_playing():
             # Calculer la position actuelle avant de mettre en pause
             if self._playback_start_time is not None:
-                elapsed = time.time() - self._playback_start_time
+                elapsed = time.monotonic() - self._playback_start_time
                 self._pause_position += elapsed
                 logger.info(f"Pause à la position: {self._pause_position:.2f} secondes")
             
@@ -198,11 +266,7 @@ class MusicPlayer:
             return False
         
         try:
-            # Arrêter la lecture actuelle
-            self.voice_client.stop()
-            
-            # Régénérer l'URL du stream pour éviter l'expiration
-            logger.info(f"Régénération de l'URL pour reprise: {self.current.title}")
+            # URL du cache si elle est encore fraîche, sinon régénérée
             stream_url = await self.youtube_source.get_fresh_stream_url(self.current)
             
             if not stream_url:
@@ -211,39 +275,27 @@ class MusicPlayer:
             
             # Créer une nouvelle source audio avec l'URL fraîche et la position de reprise
             logger.info(f"Reprise à la position: {self._pause_position:.2f} secondes")
-            audio_source = YouTubeSource.create_audio_source(stream_url, self._pause_position)
-            audio_source = discord.PCMVolumeTransformer(audio_source, volume=self.volume)
+            audio_source = YouTubeSource.create_audio_source(stream_url, self._pause_position, self.volume)
+            self._stream_url = stream_url
             
-            # Créer un événement pour la fin de lecture
-            playback_finished = asyncio.Event()
-            
-            def after_playback(error):
-                if error:
-                    logger.error(f"Erreur de lecture après reprise: {error}")
-                playback_finished.set()
-            
-            # Relancer la lecture avec la nouvelle source
-            self.voice_client.play(audio_source, after=after_playback)
+            # Remplacer la source sans stop() : le callback `after` de la piste
+            # (et la Future attendue par la boucle de lecture) reste inchangé
+            self._replace_source(audio_source)
+            self.voice_client.resume()
             
             # Réinitialiser le temps de départ pour le suivi de position
-            self._playback_start_time = time.time()
+            self._playback_start_time = time.monotonic()
             self._update_activity()
             
-            logger.info(f"Lecture reprise avec URL fraîche: {self.current.title}")
+            logger.info(f"Lecture reprise: {self.current.title}")
             return True
             
         except Exception as e:
             logger.error(
-                f"Erreur lors de la reprise: {e}",
+                "Erreur lors de la reprise: %s", e,
                 exc_info=True  # Inclut la stack trace complète
             )
-            logger.error(
-                f"État du voice_client: "
-                f"connected={self.voice_client.is_connected() if self.voice_client else False}, "
-                f"playing={self.voice_client.is_playing() if self.voice_client else False}, "
-                f"paused={self.voice_client.is_paused() if self.voice_client else False}, "
-                f"Piste: {self.current.title if self.current else 'None'}"
-            )
+            self._log_voice_state()
             return False
     
     async def skip(self) -> bool:
@@ -274,12 +326,40 @@ class MusicPlayer:
         if not 0.0 <= volume <= 1.0:
             raise InvalidVolume(volume * 100)
         
+        # Le filtre FFmpeg est arrondi au centième : inutile de relancer FFmpeg
+        # si la valeur effective ne change pas
+        changed = round(volume, 2) != round(self.volume, 2)
         self.volume = volume
-        if self.voice_client and self.voice_client.source:
-            self.voice_client.source.volume = self.volume
+        
+        # Le volume est appliqué par FFmpeg : recréer la source à la position actuelle.
+        # En pause, la nouvelle valeur sera prise en compte par resume().
+        if changed and self.voice_client and self.voice_client.is_playing() and self._stream_url:
+            position = self.get_current_position()
+            self._replace_source(YouTubeSource.create_audio_source(
+                self._stream_url, position, self.volume
+            ))
+            self._pause_position = position
+            self._playback_start_time = time.monotonic()
+        
         self._update_activity()
         logger.info(f"Volume réglé à {int(self.volume * 100)}%")
     
+    def _replace_source(self, source: discord.AudioSource) -> None:
+        """
+        Remplace la source audio en cours de lecture
+        
+        Le thread audio peut encore être dans un read() de l'ancienne source :
+        tuer son FFmpeg à cet instant ferait renvoyer une trame vide, donc finir
+        la piste. L'ancienne source n'est libérée qu'après SOURCE_CLEANUP_DELAY,
+        une fois que le thread lit la nouvelle.
+        
+        Args:
+            source: Nouvelle source audio
+        """
+        old_source = self.voice_client.source
+        self.voice_client.source = source
+        asyncio.get_running_loop().call_later(self.SOURCE_CLEANUP_DELAY, old_source.cleanup)
+    
     def is_playing(self) -> bool:
         """Vérifie si le player est en train de jouer"""
         return self._is_playing and self.voice_client and self.voice_client.is_playing()
@@ -300,47 +380,147 @@ class MusicPlayer:
             return self._pause_position
         
         # Calculer la position actuelle = position de pause + temps écoulé depuis la reprise
-        elapsed = time.time() - self._playback_start_time
+        elapsed = time.monotonic() - self._playback_start_time
         return self._pause_position + elapsed
     
     def _update_activity(self) -> None:
-        """Met à jour le timestamp de la dernière activité"""
-        self._last_activity_time = time.time()
+        """Repousse la déconnexion automatique si le player est inactif"""
+        if self._inactivity_handle is not None:
+            self._start_inactivity_timer()
+    
+    def _start_inactivity_timer(self) -> None:
+        """(Ré)arme la déconnexion automatique après Config.INACTIVITY_TIMEOUT"""
+        self._cancel_inactivity_timer()
+        self._inactivity_handle = asyncio.get_running_loop().call_later(
+            Config.INACTIVITY_TIMEOUT, self._on_inactivity_timeout
+        )
+    
+    def _cancel_inactivity_timer(self) -> None:
+        """Désarme la déconnexion automatique"""
+        if self._inactivity_handle is not None:
+            self._inactivity_handle.cancel()
+            self._inactivity_handle = None
     
-    def _check_inactivity(self) -> bool:
+    def _on_inactivity_timeout(self) -> None:
+        """Callback de la minuterie d'inactivité (exécuté par la boucle asyncio)"""
+        self._inactivity_handle = None
+        logger.info(f"Déconnexion par inactivité ({Config.INACTIVITY_TIMEOUT}s) - {self.guild.name}")
+        self._inactivity_task = asyncio.create_task(self.disconnect())
+    
+    def _log_voice_state(self) -> None:
+        """Journalise l'état du voice_client (diagnostic après une erreur)"""
+        if not logger.isEnabledFor(logging.ERROR):
+            return
+        
+        vc = self.voice_client
+        logger.error(
+            "État du voice_client: connected=%s, playing=%s, paused=%s, piste=%s",
+            vc.is_connected() if vc else False,
+            vc.is_playing() if vc else False,
+            vc.is_paused() if vc else False,
+            self.current.title if self.current else None
+        )
+    
+    def _make_after_callback(self, future: asyncio.Future) -> Callable[[Optional[Exception]], None]:
         """
-        Vérifie si le timeout d'inactivité est dépassé
+        Crée le callback `after` de discord.py pour une piste
         
+        Le callback est exécuté dans le thread audio : la Future de la piste
+        est résolue sur la boucle asyncio via call_soon_threadsafe.
+        
+        Args:
+            future: Future attendue par la boucle de lecture
+            
         Returns:
-            True si inactif depuis trop longtemps, False sinon
+            Callback à passer à VoiceClient.play
         """
-        if self._last_activity_time is None:
-            return False
+        loop = self._loop
+        
+        def after_playback(error: Optional[Exception]) -> None:
+            # Aucun traitement dans le thread audio : tout est délégué à la boucle
+            loop.call_soon_threadsafe(self._on_playback_done, future, error)
         
-        inactive_time = time.time() - self._last_activity_time
-        return inactive_time >= Config.INACTIVITY_TIMEOUT
+        return after_playback
+    
+    def _on_playback_done(self, future: asyncio.Future, error: Optional[Exception]) -> None:
+        """
+        Traite la fin d'une lecture (exécuté sur la boucle asyncio)
+        
+        Args:
+            future: Future de la piste terminée
+            error: Erreur de lecture transmise par discord.py, ou None
+        """
+        if error:
+            logger.error(f"Erreur de lecture: {error}")
+        if not future.done():
+            future.set_result(error)
+    
+    def _start_prefetch(self) -> None:
+        """Lance en arrière-plan la récupération de l'URL de la prochaine piste"""
+        next_track = self.queue.peek()
+        if next_track is None or next_track is self._prefetch_track:
+            return
+        
+        # Un préchargement remplacé (queue réordonnée) n'est pas annulé : son
+        # résultat alimente le cache de YouTubeSource si l'ordre change encore
+        task = asyncio.create_task(self.youtube_source.get_fresh_stream_url(next_track))
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
+        self._prefetch_track = next_track
+        self._prefetch_task = task
+        logger.debug("Préchargement de l'URL pour: %s", next_track.title)
+    
+    def refresh_prefetch(self) -> None:
+        """Relance le préchargement après une modification de l'ordre de la queue"""
+        if self._is_playing:
+            self._start_prefetch()
+    
+    def _cancel_prefetch(self) -> None:
+        """Annule tous les préchargements en cours"""
+        for task in self._prefetch_tasks:
+            task.cancel()
+        self._prefetch_tasks.clear()
+        self._prefetch_task = None
+        self._prefetch_track = None
+    
+    async def _get_stream_url(self, track: Track) -> Optional[str]:
+        """
+        Retourne l'URL du stream d'une piste, préchargée si possible
+        
+        Le préchargement alimente le cache de YouTubeSource, qui vérifie
+        lui-même la fraîcheur de l'URL (Config.STREAM_URL_TTL).
+        
+        Args:
+            track: Piste à jouer
+            
+        Returns:
+            URL du stream ou None si erreur
+        """
+        task, prefetched_track = self._prefetch_task, self._prefetch_track
+        self._prefetch_task = None
+        self._prefetch_track = None
+        
+        if task is not None and prefetched_track is track:
+            # Attendre la fin du préchargement plutôt que lancer une seconde extraction
+            await asyncio.wait([task])
+        
+        return await self.youtube_source.get_fresh_stream_url(track)
     
     async def _player_loop(self) -> None:
         """Boucle principale de lecture audio"""
         logger.info("Boucle de lecture démarrée")
+        # Boucle asyncio du player, utilisée par les callbacks du thread audio
+        self._loop = asyncio.get_running_loop()
         
         try:
             while True:
-                # Vérifier l'inactivité
-                if self._check_inactivity():
-                    logger.info(f"Déconnexion par inactivité ({Config.INACTIVITY_TIMEOUT}s) - {self.guild.name}")
-                    await self.disconnect()
-                    break
-                
-                # Attendre qu'une piste soit disponible
-                while await self.queue.is_empty():
+                # Attendre qu'une piste soit disponible ; la minuterie d'inactivité
+                # déconnecte le bot si rien n'est ajouté d'ici là
+                if self.queue.is_empty():
                     self._is_playing = False
-                    # Vérifier l'inactivité pendant l'attente
-                    if self._check_inactivity():
-                        logger.info(f"Déconnexion par inactivité ({Config.INACTIVITY_TIMEOUT}s) - {self.guild.name}")
-                        await self.disconnect()
-                        return
-                    await asyncio.sleep(1)
+                    self._start_inactivity_timer()
+                    await self.queue.wait_not_empty()
+                    self._cancel_inactivity_timer()
                 
                 # Récupérer la prochaine piste
                 track = await self.queue.next()
@@ -351,62 +531,56 @@ class MusicPlayer:
                 self._skip_requested = False
                 
                 try:
-                    # Toujours régénérer l'URL du stream juste avant la lecture
-                    # pour éviter les problèmes d'expiration (URLs YouTube expirent après ~6h)
-                    logger.info(f"Régénération de l'URL du stream pour: {track.title}")
-                    stream_url = await self.youtube_source.get_fresh_stream_url(track)
+                    # URL préchargée pendant la piste précédente, sinon régénérée
+                    # maintenant (les URLs YouTube expirent après ~6h)
+                    stream_url = await self._get_stream_url(track)
                     
                     if not stream_url:
                         logger.error(f"Impossible d'obtenir l'URL du stream pour: {track.title}")
                         continue
                     
                     # Créer la source audio avec l'URL fraîche
-                    audio_source = YouTubeSource.create_audio_source(stream_url)
-                    audio_source = discord.PCMVolumeTransformer(audio_source, volume=self.volume)
+                    audio_source = YouTubeSource.create_audio_source(stream_url, volume=self.volume)
+                    self._stream_url = stream_url
                     
-                    # Créer un événement pour attendre la fin de la lecture
-                    playback_finished = asyncio.Event()
-                    
-                    def after_playback(error):
-                        """Callback appelé après la fin de la lecture"""
-                        if error:
-                            logger.error(f"Erreur de lecture: {error}")
-                        playback_finished.set()
+                    # Future résolue depuis le thread audio à la fin de la lecture
+                    playback_done = self._loop.create_future()
                     
                     # Lancer la lecture
                     if self.voice_client and self.voice_client.is_connected():
                         # Vérifier l'état du voice_client avant de jouer
                         if self.voice_client.is_playing():
                             logger.warning(
-                                f"Le voice_client est déjà en train de jouer. "
-                                f"État: is_playing={self.voice_client.is_playing()}, "
-                                f"is_paused={self.voice_client.is_paused()}, "
-                                f"Piste actuelle: {self.current.title if self.current else 'None'}, "
-                                f"Nouvelle piste: {track.title}"
+                                "Le voice_client est déjà en train de jouer "
+                                "(paused=%s), arrêt avant: %s",
+                                self.voice_client.is_paused(), track.title
                             )
                             # Arrêter la lecture actuelle avant de continuer
+                            # (attente bornée à 1s si le thread audio tarde à s'arrêter)
                             self.voice_client.stop()
-                            # Attendre un peu pour que l'arrêt soit effectif
-                            await asyncio.sleep(0.2)
+                            for _ in range(100):
+                                if not self.voice_client.is_playing():
+                                    break
+                                await asyncio.sleep(0.01)
                         
                         self._is_playing = True
                         
                         # Initialiser le temps de départ et réinitialiser la position de pause
-                        self._playback_start_time = time.time()
+                        self._playback_start_time = time.monotonic()
                         self._pause_position = 0.0
                         self._update_activity()
                         
-                        logger.info(
-                            f"Démarrage de la lecture: {track.title} "
-                            f"(État: is_playing={self.voice_client.is_playing()}, "
-                            f"is_paused={self.voice_client.is_paused()})"
+                        self.voice_client.play(
+                            audio_source,
+                            after=self._make_after_callback(playback_done)
                         )
+                        logger.info("Lecture en cours: %s", track.title)
                         
-                        self.voice_client.play(audio_source, after=after_playback)
-                        logger.info(f"Lecture en cours: {track.title}")
+                        # Précharger l'URL de la piste suivante pendant la lecture
+                        self._start_prefetch()
                         
                         # Attendre la fin de la lecture
-                        await playback_finished.wait()
+                        await playback_done
                         
                         # Si loop activé et pas de skip, remettre la piste dans la queue
                         if self.loop and not self._skip_requested:
@@ -414,20 +588,11 @@ class MusicPlayer:
                     
                 except Exception as e:
                     logger.error(
-                        f"Erreur lors de la lecture de {track.title}: {e}",
+                        "Erreur lors de la lecture de %s: %s", track.title, e,
                         exc_info=True  # Inclut la stack trace complète
                     )
-                    logger.error(
-                        f"État du voice_client: "
-                        f"connected={self.voice_client.is_connected() if self.voice_client else False}, "
-                        f"playing={self.voice_client.is_playing() if self.voice_client else False}, "
-                        f"paused={self.voice_client.is_paused() if self.voice_client else False}"
-                    )
+                    self._log_voice_state()
                     continue
-                
-                finally:
-                    # Petit délai entre les pistes
-                    await asyncio.sleep(0.5)
         
         except asyncio.CancelledError:
             logger.info("Boucle de lecture arrêtée")
@@ -1,4 +1,4 @@
-"""File d'attente thread-safe pour la gestion des pistes audio"""
+"""File d'attente pour la gestion des pistes audio"""
 
 import asyncio
 from typing import List, Optional
@@ -9,12 +9,19 @@ from .track import Track
 
 
 class MusicQueue:
-    """File d'attente thread-safe pour un serveur Discord"""
+    """
+    File d'attente pour un serveur Discord
+    
+    Toutes les opérations s'exécutent sur la boucle asyncio du bot et aucune
+    ne contient d'await pendant qu'elle modifie la deque : elles sont donc
+    atomiques sans verrou.
+    """
     
     def __init__(self):
         self._queue: deque[Track] = deque()
         self._current: Optional[Track] = None
-        self._lock = asyncio.Lock()
+        # Signalé dès qu'une piste est disponible, pour éviter l'attente active
+        self._not_empty = asyncio.Event()
     
     async def add(self, track: Track) -> int:
         """
@@ -26,9 +33,25 @@ class MusicQueue:
         Returns:
             La position de la piste dans la queue (1-indexed)
         """
-        async with self._lock:
-            self._queue.append(track)
-            return len(self._queue)
+        self._queue.append(track)
+        self._not_empty.set()
+        return len(self._queue)
+    
+    async def add_many(self, tracks: List[Track]) -> int:
+        """
+        Ajoute plusieurs pistes à la queue en un seul extend (sans verrou, voir la classe)
+        
+        Args:
+            tracks: Les pistes à ajouter
+            
+        Returns:
+            La position de la première piste ajoutée dans la queue (1-indexed)
+        """
+        start = len(self._queue) + 1
+        self._queue.extend(tracks)
+        if self._queue:
+            self._not_empty.set()
+        return start
     
     async def next(self) -> Optional[Track]:
         """
@@ -37,54 +60,88 @@ class MusicQueue:
         Returns:
             La prochaine piste ou None si la queue est vide
         """
-        async with self._lock:
-            if self._queue:
-                self._current = self._queue.popleft()
-                return self._current
-            return None
+        if self._queue:
+            self._current = self._queue.popleft()
+            if not self._queue:
+                self._not_empty.clear()
+            return self._current
+        return None
+    
+    async def clear(self) -> int:
+        """
+        Vide complètement la queue
+        
+        Returns:
+            Nombre de pistes retirées
+        """
+        size = len(self._queue)
+        self._queue.clear()
+        self._current = None
+        self._not_empty.clear()
+        return size
+    
+    async def shuffle(self) -> int:
+        """
+        Mélange aléatoirement les pistes dans la queue
+        
+        Returns:
+            Nombre de pistes mélangées
+        """
+        # Mélange en place (deque supporte l'accès indexé)
+        random.shuffle(self._queue)
+        return len(self._queue)
     
-    async def clear(self) -> None:
-        """Vide complètement la queue"""
-        async with self._lock:
-            self._queue.clear()
-            self._current = None
+    def peek(self) -> Optional[Track]:
+        """
+        Retourne la prochaine piste sans la retirer de la queue
+        
+        Returns:
+            La prochaine piste ou None si la queue est vide
+        """
+        return self._queue[0] if self._queue else None
     
-    async def shuffle(self) -> None:
-        """Mélange aléatoirement les pistes dans la queue"""
-        async with self._lock:
-            queue_list = list(self._queue)
-            random.shuffle(queue_list)
-            self._queue = deque(queue_list)
+    async def wait_not_empty(self, timeout: Optional[float] = None) -> bool:
+        """
+        Attend (sans polling) qu'au moins une piste soit dans la queue
+        
+        Args:
+            timeout: Durée maximale d'attente en secondes (None = illimitée)
+            
+        Returns:
+            True si une piste est disponible, False si le timeout a expiré
+        """
+        try:
+            await asyncio.wait_for(self._not_empty.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
     
-    async def get_list(self) -> List[Track]:
+    def get_list(self) -> List[Track]:
         """
         Retourne une copie de la liste des pistes
         
         Returns:
             Liste des pistes dans la queue
         """
-        async with self._lock:
-            return list(self._queue)
+        return list(self._queue)
     
-    async def is_empty(self) -> bool:
+    def is_empty(self) -> bool:
         """
         Vérifie si la queue est vide
         
         Returns:
             True si la queue est vide, False sinon
         """
-        async with self._lock:
-            return len(self._queue) == 0
+        return not self._queue
     
-    async def size(self) -> int:
+    def size(self) -> int:
         """
         Retourne le nombre de pistes dans la queue
         
         Returns:
             Nombre de pistes
         """
-        async with self._lock:
-            return len(self._queue)
+        return len(self._queue)
     
     def current(self) -> Optional[Track]:
         """
@@ -105,15 +162,17 @@ class MusicQueue:
         Returns:
             La piste retirée ou None si position invalide
         """
-        async with self._lock:
-            if 1 <= position <= len(self._queue):
-                # Convertir en index 0-based
-                index = position - 1
-                queue_list = list(self._queue)
-                removed = queue_list.pop(index)
-                self._queue = deque(queue_list)
-                return removed
-            return None
+        if 1 <= position <= len(self._queue):
+            # Convertir en index 0-based
+            index = position - 1
+            # Rotation plutôt que copie de la queue en liste
+            self._queue.rotate(-index)
+            removed = self._queue.popleft()
+            self._queue.rotate(index)
+            if not self._queue:
+                self._not_empty.clear()
+            return removed
+        return None
     
     async def move(self, from_position: int, to_position: int) -> Optional[Track]:
         """
@@ -126,19 +185,17 @@ class MusicQueue:
         Returns:
             La piste déplacée ou None si positions invalides
         """
-        async with self._lock:
-            if not (1 <= from_position <= len(self._queue) and 1 <= to_position <= len(self._queue)):
-                return None
-            
-            # Convertir en index 0-based
-            from_idx = from_position - 1
-            to_idx = to_position - 1
-            
-            # Déplacer la piste
-            queue_list = list(self._queue)
-            track = queue_list.pop(from_idx)
-            queue_list.insert(to_idx, track)
-            self._queue = deque(queue_list)
-            
-            return track
+        if not (1 <= from_position <= len(self._queue) and 1 <= to_position <= len(self._queue)):
+            return None
+        
+        # Convertir en index 0-based
+        from_idx = from_position - 1
+        to_idx = to_position - 1
+        
+        # Déplacer la piste en place (sans recopier la queue en liste)
+        track = self._queue[from_idx]
+        del self._queue[from_idx]
+        self._queue.insert(to_idx, track)
+        
+        return track
 
@@ -1,9 +1,11 @@
 """Intégration Spotify avec conversion vers YouTube"""
 
+import asyncio
 import logging
 import re
+from operator import itemgetter
 from typing import Optional, List, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 
@@ -11,8 +13,11 @@ from bot.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Champs d'une piste de l'API Spotify, extraits en un seul appel
+_get_track_fields = itemgetter('name', 'artists', 'album')
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class SpotifyTrackInfo:
     """Informations d'une piste Spotify"""
     
@@ -21,11 +26,11 @@ class SpotifyTrackInfo:
     album: str          # Album
     duration_ms: int    # Durée en millisecondes
     url: str            # URL Spotify
+    search_query: str = field(init=False, repr=False)  # Query de recherche YouTube
     
-    @property
-    def search_query(self) -> str:
-        """Génère une query de recherche YouTube optimisée"""
-        return f"{self.artist} - {self.title}"
+    def __post_init__(self):
+        # Calculée une seule fois (instance immuable)
+        object.__setattr__(self, 'search_query', f"{self.artist} - {self.title}")
     
     @property
     def duration_seconds(self) -> int:
@@ -36,10 +41,18 @@ class SpotifyTrackInfo:
 class SpotifySource:
     """Gestionnaire d'extraction de métadonnées Spotify"""
     
-    # Patterns pour extraire les IDs depuis les URLs Spotify
-    TRACK_PATTERN = re.compile(r'track/([a-zA-Z0-9]+)')
-    PLAYLIST_PATTERN = re.compile(r'playlist/([a-zA-Z0-9]+)')
-    ALBUM_PATTERN = re.compile(r'album/([a-zA-Z0-9]+)')
+    # Pattern pour reconnaître une URL Spotify et en extraire le type et l'ID (une seule passe)
+    URL_PATTERN = re.compile(
+        r'(?:https?://)?(?:open|play)\.spotify\.com/(?:intl-[\w-]+/)?'
+        r'(?P<kind>track|playlist|album)/(?P<id>[a-zA-Z0-9]+)'
+    )
+    
+    # Pagination des playlists (100 = maximum accepté par l'API)
+    PAGE_SIZE = 100
+    # Champs demandés pour chaque page de playlist : l'API ne renvoie que ce qui
+    # est utilisé (sans les marchés disponibles, pochettes, etc. de chaque piste)
+    PLAYLIST_FIELDS = 'total,items(track(name,duration_ms,external_urls(spotify),artists(name),album(name)))'
+    MAX_CONCURRENT_PAGES = 4
     
     def __init__(self, client_id: str = None, client_secret: str = None):
         """
@@ -68,6 +81,9 @@ class SpotifySource:
             logger.error(f"Erreur lors de l'initialisation du client Spotify: {e}")
             self.sp = None
     
+    # Les appels spotipy sont des requêtes HTTP bloquantes : ils sont exécutés
+    # dans un thread (asyncio.to_thread) pour ne pas bloquer la boucle asyncio
+    
     def is_available(self) -> bool:
         """Vérifie si le client Spotify est disponible"""
         return self.sp is not None
@@ -76,33 +92,26 @@ class SpotifySource:
         """
         Extrait le type et l'ID depuis une URL Spotify
         
+        Sert aussi de détection : une seule recherche du pattern précompilé
+        suffit pour savoir si une requête est un lien Spotify exploitable.
+        
         Args:
             url: URL Spotify
             
         Returns:
-            Tuple (type, id) ou None si invalide
+            Tuple (type, id) ou None si ce n'est pas une URL Spotify valide
             type peut être: 'track', 'playlist', 'album'
         """
-        # Vérifier track
-        match = self.TRACK_PATTERN.search(url)
-        if match:
-            return ('track', match.group(1))
-        
-        # Vérifier playlist
-        match = self.PLAYLIST_PATTERN.search(url)
+        match = self.URL_PATTERN.search(url)
         if match:
-            return ('playlist', match.group(1))
-        
-        # Vérifier album
-        match = self.ALBUM_PATTERN.search(url)
-        if match:
-            return ('album', match.group(1))
+            return (match['kind'], match['id'])
         
         return None
     
     def is_spotify_url(self, url: str) -> bool:
         """Vérifie si une URL est une URL Spotify"""
-        return 'spotify.com' in url or 'open.spotify' in url
+        # 'open.spotify.com' contient déjà 'spotify.com'
+        return 'spotify.com' in url
     
     async def get_track(self, url: str) -> Optional[SpotifyTrackInfo]:
         """
@@ -125,7 +134,7 @@ class SpotifySource:
                 return None
             
             track_id = result[1]
-            track = self.sp.track(track_id)
+            track = await asyncio.to_thread(self.sp.track, track_id)
             
             return SpotifyTrackInfo(
                 title=track['name'],
@@ -162,30 +171,48 @@ class SpotifySource:
             playlist_id = result[1]
             tracks = []
             
-            # Récupérer toutes les pistes (pagination)
-            results = self.sp.playlist_tracks(playlist_id)
-            
-            while results:
-                for item in results['items']:
-                    if item and item.get('track'):
-                        track = item['track']
-                        # Vérifier que toutes les données nécessaires sont présentes
-                        if not track.get('name') or not track.get('artists') or not track.get('album'):
-                            continue
-                        
-                        tracks.append(SpotifyTrackInfo(
-                            title=track['name'],
-                            artist=track['artists'][0]['name'],
-                            album=track['album']['name'],
-                            duration_ms=track.get('duration_ms', 0),
-                            url=track.get('external_urls', {}).get('spotify', '')
-                        ))
-                
-                # Pagination
-                if results['next']:
-                    results = self.sp.next(results)
-                else:
-                    break
+            # Première page : donne le nombre total de pistes
+            first_page = await asyncio.to_thread(
+                self.sp.playlist_tracks, playlist_id,
+                fields=self.PLAYLIST_FIELDS, limit=self.PAGE_SIZE, offset=0
+            )
+            
+            # Pages suivantes récupérées en parallèle (concurrence bornée)
+            semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_PAGES)
+            
+            async def fetch_page(offset: int) -> dict:
+                async with semaphore:
+                    return await asyncio.to_thread(
+                        self.sp.playlist_tracks, playlist_id,
+                        fields=self.PLAYLIST_FIELDS, limit=self.PAGE_SIZE, offset=offset
+                    )
+            
+            offsets = range(self.PAGE_SIZE, first_page['total'], self.PAGE_SIZE)
+            pages = [first_page, *await asyncio.gather(*(fetch_page(offset) for offset in offsets))]
+            
+            append = tracks.append
+            for page in pages:
+                for item in page['items']:
+                    track = item.get('track') if item else None
+                    if not track:
+                        continue
+                    
+                    # Vérifier que toutes les données nécessaires sont présentes
+                    try:
+                        name, artists, album = _get_track_fields(track)
+                    except KeyError:
+                        continue
+                    if not name or not artists or not album:
+                        continue
+                    
+                    urls = track.get('external_urls')
+                    append(SpotifyTrackInfo(
+                        title=name,
+                        artist=artists[0]['name'],
+                        album=album['name'],
+                        duration_ms=track.get('duration_ms') or 0,
+                        url=urls.get('spotify', '') if urls else ''
+                    ))
             
             logger.info(f"Playlist Spotify extraite: {len(tracks)} pistes")
             return tracks
@@ -215,20 +242,26 @@ class SpotifySource:
                 return []
             
             album_id = result[1]
-            album = self.sp.album(album_id)
+            album = await asyncio.to_thread(self.sp.album, album_id)
+            album_name = album['name']
             tracks = []
+            append = tracks.append
             
             for track in album['tracks']['items']:
                 # Vérifier que toutes les données nécessaires sont présentes
-                if not track.get('name') or not track.get('artists'):
+                # (les pistes d'un album n'ont pas de champ 'album')
+                name = track.get('name')
+                artists = track.get('artists')
+                if not name or not artists:
                     continue
                 
-                tracks.append(SpotifyTrackInfo(
-                    title=track['name'],
-                    artist=track['artists'][0]['name'],
-                    album=album['name'],
-                    duration_ms=track.get('duration_ms', 0),
-                    url=track.get('external_urls', {}).get('spotify', '')
+                urls = track.get('external_urls')
+                append(SpotifyTrackInfo(
+                    title=name,
+                    artist=artists[0]['name'],
+                    album=album_name,
+                    duration_ms=track.get('duration_ms') or 0,
+                    url=urls.get('spotify', '') if urls else ''
                 ))
             
             logger.info(f"Album Spotify extrait: {len(tracks)} pistes")
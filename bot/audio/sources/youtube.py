@@ -3,11 +3,15 @@
 import asyncio
 import logging
 import re
-from typing import Optional, List, Dict, Any
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional, List, Dict, Any, Tuple
 import discord
 import yt_dlp
 
 from bot.audio.track import Track
+from bot.config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -32,14 +36,185 @@ class YouTubeSource:
         'source_address': '0.0.0.0',  # Bind to ipv4 since ipv6 addresses cause issues sometimes
     }
     
+    # Options de l'instance principale (vidéos) : les formats audio d'une vidéo proviennent
+    # de la réponse du lecteur, inutile de télécharger et d'analyser les manifestes DASH/HLS.
+    # Les directs n'ont que des formats HLS : ils sont extraits par l'instance complète.
+    SKIP_MANIFESTS_OPTIONS = {
+        'youtube_include_dash_manifest': False,
+        'youtube_include_hls_manifest': False,
+    }
+    
     # Options FFmpeg pour discord.py
     FFMPEG_OPTIONS = {
         'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
         'options': '-vn'
     }
     
+    # Pattern des URLs YouTube (compilé une seule fois)
+    URL_PATTERN = re.compile(r'(https?://)?(www\.)?(youtube\.com|youtu\.be)/')
+    # Toute requête ressemblant à une URL (schéma, ou hôte suivi d'un chemin) : non normalisée
+    URL_LIKE_PATTERN = re.compile(r'[a-z][a-z0-9+.-]*://|[\w-]+(?:\.[\w-]+)+/', re.IGNORECASE)
+    # URL canonique d'une vidéo (webpage_url des pistes) : extracteur YouTube connu d'avance
+    WATCH_URL_PATTERN = re.compile(r'https://www\.youtube\.com/watch\?v=[\w-]{11}')
+    
+    # Cache des extractions (partagé entre tous les serveurs)
+    CACHE_SIZE = 512
+    CACHE_TTL = 5 * 3600          # Métadonnées (les URLs YouTube expirent après ~6h)
+    
+    # Titres des entrées de playlist indisponibles (mode extract_flat)
+    UNAVAILABLE_TITLES = frozenset({'[Private video]', '[Deleted video]'})
+    
+    # Threads dédiés aux appels yt-dlp (I/O réseau), distincts de l'executor par défaut
+    EXECUTOR_WORKERS = 16
+    
+    # Recherches simultanées lors d'un chargement en lot (évite d'être limité par YouTube)
+    SEARCH_CONCURRENCY = 5
+    
     def __init__(self):
-        self.ytdl = yt_dlp.YoutubeDL(self.YTDL_OPTIONS)
+        # Les instances YoutubeDL vivent aussi longtemps que le bot : avec le
+        # handler HTTP `requests` (extra yt-dlp[default]), leurs connexions
+        # keep-alive vers YouTube sont réutilisées d'une extraction à l'autre
+        self.ytdl = yt_dlp.YoutubeDL({**self.YTDL_OPTIONS, **self.SKIP_MANIFESTS_OPTIONS})
+        # Instance avec les manifestes, pour les extractions sans format hors manifeste (directs)
+        self.ytdl_full = yt_dlp.YoutubeDL(self.YTDL_OPTIONS)
+        # Instance dédiée aux playlists, créée une seule fois (initialisation coûteuse)
+        self.ytdl_playlist = yt_dlp.YoutubeDL({
+            **self.YTDL_OPTIONS,
+            'noplaylist': False,
+            'extract_flat': True,  # Ne pas télécharger, juste extraire les infos
+        })
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.EXECUTOR_WORKERS,
+            thread_name_prefix="ytdl"
+        )
+        # query -> (timestamp, données réduites)
+        self._info_cache: OrderedDict[str, Tuple[float, Dict[str, Any]]] = OrderedDict()
+        # Extractions en cours (clé de cache -> tâche partagée par les appelants)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Partagé par tous les chargements en lot, tous serveurs confondus
+        self._search_slots = asyncio.Semaphore(self.SEARCH_CONCURRENCY)
+    
+    async def _extract_info(self, query: str, max_age: float = None) -> Optional[Dict[str, Any]]:
+        """
+        Extrait les informations d'une vidéo via yt-dlp, avec cache LRU
+        (les extractions identiques simultanées sont regroupées)
+        
+        Args:
+            query: URL YouTube ou terme de recherche
+            max_age: Âge maximum accepté pour une entrée en cache (défaut: CACHE_TTL)
+            
+        Returns:
+            Données réduites de la vidéo ou None si non trouvée
+        """
+        if max_age is None:
+            max_age = self.CACHE_TTL
+        
+        key = self._cache_key(query)
+        cached = self._info_cache.get(key)
+        if cached:
+            age = time.monotonic() - cached[0]
+            if age < max_age:
+                self._info_cache.move_to_end(key)
+                return cached[1]
+            if age >= self.CACHE_TTL:
+                # Entrée périmée : la retirer plutôt que la laisser occuper le cache
+                del self._info_cache[key]
+        
+        # Extraction identique déjà en cours (même playlist chargée deux fois,
+        # pistes communes) : attendre son résultat plutôt que la relancer
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_info(query, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # Protégée : l'annulation d'un appelant n'interrompt pas les autres
+        return await asyncio.shield(task)
+    
+    async def _fetch_info(self, query: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Extrait les informations d'une vidéo via yt-dlp et les met en cache
+        
+        Args:
+            query: URL YouTube ou terme de recherche
+            key: Clé de cache de la requête
+            
+        Returns:
+            Données réduites de la vidéo ou None si non trouvée
+        """
+        # Exécuter l'extraction dans un thread séparé pour ne pas bloquer
+        loop = asyncio.get_running_loop()
+        # Pour une URL canonique, désigner directement l'extracteur YouTube évite
+        # de tester chaque extracteur de yt-dlp sur l'URL
+        ie_key = 'Youtube' if self.WATCH_URL_PATTERN.fullmatch(query) else None
+        
+        # Fonction et arguments passés directement (positionnels: download, ie_key)
+        try:
+            data = await loop.run_in_executor(
+                self._executor, self.ytdl.extract_info, query, False, ie_key
+            )
+        except yt_dlp.utils.DownloadError as e:
+            if 'Requested format is not available' not in str(e):
+                raise
+            # Aucun format hors manifestes (direct) : nouvelle extraction avec les manifestes
+            logger.debug("Aucun format sans manifeste pour %s, extraction complète", query)
+            data = await loop.run_in_executor(
+                self._executor, self.ytdl_full.extract_info, query, False, ie_key
+            )
+        
+        if data is None:
+            return None
+        
+        # Si c'est une playlist, prendre la première vidéo
+        if 'entries' in data:
+            data = data['entries'][0]
+        
+        # Ne conserver que les champs utiles (les données complètes sont volumineuses)
+        thumbnail = data.get('thumbnail', '')
+        if not thumbnail and data.get('thumbnails'):
+            thumbnail = data['thumbnails'][-1]['url']
+        info = {
+            'title': data.get('title'),
+            'webpage_url': data.get('webpage_url'),
+            'url': data.get('url'),
+            'duration': data.get('duration'),
+            'thumbnail': thumbnail,
+        }
+        
+        # Indexer aussi par URL de la vidéo : après une recherche par mots-clés,
+        # get_fresh_stream_url (appelé avec track.url) trouve l'entrée en cache
+        entry = (time.monotonic(), info)
+        for entry_key in {key, info['webpage_url']}:
+            if entry_key:
+                self._info_cache[entry_key] = entry
+                self._info_cache.move_to_end(entry_key)
+        while len(self._info_cache) > self.CACHE_SIZE:
+            self._info_cache.popitem(last=False)
+        
+        return info
+    
+    def _cache_key(self, query: str) -> str:
+        """
+        Normalise une requête pour le cache
+        
+        Les termes de recherche sont comparés sans tenir compte de la casse ni
+        des espaces superflus ; les URLs (tout site, identifiants sensibles à la
+        casse) sont gardées telles quelles.
+        
+        Args:
+            query: URL YouTube ou terme de recherche
+            
+        Returns:
+            Clé de cache
+        """
+        query = query.strip()
+        if self.URL_LIKE_PATTERN.match(query):
+            return query
+        return " ".join(query.split()).casefold()
+    
+    async def close(self) -> None:
+        """Arrête les threads d'extraction (les extractions en cours ne sont pas attendues)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
     
     def is_youtube_url(self, url: str) -> bool:
         """
@@ -51,10 +226,7 @@ class YouTubeSource:
         Returns:
             True si c'est une URL YouTube
         """
-        youtube_patterns = [
-            r'(https?://)?(www\.)?(youtube\.com|youtu\.be)/',
-        ]
-        return any(re.match(pattern, url) for pattern in youtube_patterns)
+        return self.URL_PATTERN.match(url) is not None
     
     def is_youtube_playlist_url(self, url: str) -> bool:
         """
@@ -81,27 +253,60 @@ class YouTubeSource:
             Track ou None si non trouvé
         """
         try:
-            # Exécuter la recherche dans un thread séparé pour ne pas bloquer
-            loop = asyncio.get_event_loop()
-            data = await loop.run_in_executor(
-                None,
-                lambda: self.ytdl.extract_info(query, download=False)
-            )
+            data = await self._extract_info(query)
             
             if data is None:
                 logger.warning(f"Aucun résultat pour: {query}")
                 return None
             
-            # Si c'est une playlist, prendre la première vidéo
-            if 'entries' in data:
-                data = data['entries'][0]
-            
             return self._create_track(data, requester)
             
         except Exception as e:
             logger.error(f"Erreur lors de la recherche YouTube: {e}")
             return None
     
+    async def search_many(self, queries: List[str], requester: discord.Member) -> List[Optional[Track]]:
+        """
+        Recherche plusieurs pistes en parallèle (au plus SEARCH_CONCURRENCY à la fois)
+        
+        Args:
+            queries: URLs YouTube ou termes de recherche
+            requester: Membre Discord qui a fait la demande
+            
+        Returns:
+            Tracks dans l'ordre des requêtes (None pour celles non trouvées)
+        """
+        return await asyncio.gather(*(self._bounded_search(query, requester) for query in queries))
+    
+    async def search_iter(self, queries: List[str], requester: discord.Member) -> AsyncIterator[Optional[Track]]:
+        """
+        Recherche plusieurs pistes en parallèle et les renvoie au fil de l'eau
+        
+        Les résultats sont produits dans l'ordre des requêtes, dès que chacun est
+        disponible : la première piste peut être utilisée sans attendre les
+        suivantes. Les recherches restantes sont annulées si l'appelant arrête
+        l'itération.
+        
+        Args:
+            queries: URLs YouTube ou termes de recherche
+            requester: Membre Discord qui a fait la demande
+            
+        Yields:
+            Tracks dans l'ordre des requêtes (None pour celles non trouvées)
+        """
+        tasks = [asyncio.create_task(self._bounded_search(query, requester)) for query in queries]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _bounded_search(self, query: str, requester: discord.Member) -> Optional[Track]:
+        """Recherche une piste en respectant la limite de SEARCH_CONCURRENCY recherches simultanées"""
+        async with self._search_slots:
+            return await self.search(query, requester)
+    
     async def extract_playlist(self, url: str, requester: discord.Member) -> List[Track]:
         """
         Extrait toutes les vidéos d'une playlist YouTube
@@ -114,31 +319,22 @@ class YouTubeSource:
             Liste de Tracks
         """
         try:
-            # Options modifiées pour accepter les playlists
-            ytdl_playlist = yt_dlp.YoutubeDL({
-                **self.YTDL_OPTIONS,
-                'noplaylist': False,
-                'extract_flat': True,  # Ne pas télécharger, juste extraire les infos
-            })
-            
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             data = await loop.run_in_executor(
-                None,
-                lambda: ytdl_playlist.extract_info(url, download=False)
+                self._executor, self.ytdl_playlist.extract_info, url, False
             )
             
             if data is None or 'entries' not in data:
                 logger.warning(f"Playlist vide ou invalide: {url}")
                 return []
             
-            tracks = []
-            for entry in data['entries']:
-                if entry:
-                    # Extraire les infos complètes pour chaque vidéo
-                    video_url = f"https://www.youtube.com/watch?v={entry['id']}"
-                    track = await self.search(video_url, requester)
-                    if track:
-                        tracks.append(track)
+            # Les entrées "flat" suffisent pour créer les pistes : l'extraction
+            # complète n'a lieu qu'à la lecture (get_fresh_stream_url)
+            tracks = [
+                self._create_track(entry, requester)
+                for entry in data['entries']
+                if entry and entry.get('id') and entry.get('title') not in self.UNAVAILABLE_TITLES
+            ]
             
             logger.info(f"Playlist extraite: {len(tracks)} pistes")
             return tracks
@@ -152,7 +348,7 @@ class YouTubeSource:
         Crée un objet Track à partir des données YouTube
         
         Args:
-            data: Données extraites par yt-dlp
+            data: Données extraites par yt-dlp (complètes ou entrée "flat" de playlist)
             requester: Membre Discord qui a fait la demande
             
         Returns:
@@ -160,14 +356,19 @@ class YouTubeSource:
         """
         # Récupérer la miniature (thumbnail)
         thumbnail = data.get('thumbnail', '')
-        if not thumbnail and 'thumbnails' in data and data['thumbnails']:
-            thumbnail = data['thumbnails'][-1]['url']
+        if not thumbnail and data.get('thumbnails'):
+            thumbnail = data['thumbnails'][-1].get('url', '')
+        
+        # Les entrées "flat" n'ont pas de webpage_url
+        url = data.get('webpage_url')
+        if not url and data.get('id'):
+            url = f"https://www.youtube.com/watch?v={data['id']}"
         
         return Track(
-            title=data.get('title', 'Titre inconnu'),
-            url=data.get('webpage_url', data.get('url', '')),
+            title=data.get('title') or 'Titre inconnu',
+            url=url or data.get('url') or '',
             stream_url=None,  # Ne pas stocker l'URL du stream, elle sera régénérée avant la lecture
-            duration=data.get('duration', 0),
+            duration=int(data.get('duration') or 0),
             thumbnail=thumbnail,
             source='youtube',
             requester=requester
@@ -176,7 +377,8 @@ class YouTubeSource:
     async def get_fresh_stream_url(self, track: Track) -> Optional[str]:
         """
         Récupère une URL de stream fraîche pour une piste
-        Cette méthode doit être appelée juste avant la lecture pour éviter l'expiration
+        Cette méthode doit être appelée juste avant la lecture pour éviter l'expiration ;
+        une URL extraite depuis moins de Config.STREAM_URL_TTL est réutilisée
         
         Args:
             track: Track pour laquelle obtenir l'URL
@@ -185,39 +387,33 @@ class YouTubeSource:
             URL du stream ou None si erreur
         """
         try:
-            loop = asyncio.get_event_loop()
-            data = await loop.run_in_executor(
-                None,
-                lambda: self.ytdl.extract_info(track.url, download=False)
-            )
+            data = await self._extract_info(track.url, max_age=Config.STREAM_URL_TTL)
             
             if data is None:
                 logger.error(f"Impossible de régénérer l'URL pour: {track.title}")
                 return None
             
-            # Si c'est une playlist, prendre la première vidéo
-            if 'entries' in data:
-                data = data['entries'][0]
-            
-            stream_url = data.get('url')
-            logger.info(f"URL de stream régénérée pour: {track.title}")
-            return stream_url
+            return data.get('url')
             
         except Exception as e:
             logger.error(f"Erreur lors de la régénération de l'URL: {e}")
             return None
     
     @staticmethod
-    def create_audio_source(stream_url: str, seek_position: float = 0):
+    def create_audio_source(stream_url: str, seek_position: float = 0, volume: float = 1.0):
         """
         Crée une source audio FFmpeg pour discord.py
         
+        Le volume est appliqué par le filtre `volume` de FFmpeg et la sortie est
+        déjà encodée en Opus : aucun traitement par trame n'a lieu en Python.
+        
         Args:
             stream_url: URL du stream audio
             seek_position: Position de départ en secondes (pour resume)
+            volume: Niveau de volume (0.0 à 1.0)
             
         Returns:
-            discord.FFmpegPCMAudio
+            discord.FFmpegOpusAudio
         """
         # Ajouter l'option -ss si une position de départ est spécifiée
         before_options = YouTubeSource.FFMPEG_OPTIONS['before_options']
@@ -225,8 +421,8 @@ class YouTubeSource:
             before_options = f'-ss {seek_position} {before_options}'
             logger.info(f"Création de la source audio avec seek à {seek_position:.2f}s")
         
-        return discord.FFmpegPCMAudio(
+        return discord.FFmpegOpusAudio(
             stream_url,
             before_options=before_options,
-            options=YouTubeSource.FFMPEG_OPTIONS['options']
+            options=f"{YouTubeSource.FFMPEG_OPTIONS['options']} -af volume={volume:.2f}"
         )
@@ -1,13 +1,17 @@
 """Modèle de données pour une piste audio"""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 import discord
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Track:
-    """Représente une piste audio à jouer"""
+    """
+    Représente une piste audio à jouer
+    
+    Immuable : utiliser dataclasses.replace() pour obtenir une copie modifiée.
+    """
     
     title: str                      # Titre de la piste
     url: str                        # URL originale (YouTube, Spotify, etc.)
@@ -16,14 +20,16 @@ class Track:
     thumbnail: str                  # URL de la miniature
     source: str                     # Source: 'youtube' | 'spotify'
     requester: discord.Member       # Membre qui a demandé la piste
+    duration_formatted: str = field(init=False, repr=False, compare=False)  # Durée formatée (MM:SS)
+    
+    def __post_init__(self):
+        # yt-dlp peut fournir une durée flottante (entrées de playlist) : ramenée en secondes entières
+        duration = int(self.duration or 0)
+        object.__setattr__(self, 'duration', duration)
+        # Calculée une seule fois (instance immuable)
+        minutes, seconds = divmod(duration, 60)
+        object.__setattr__(self, 'duration_formatted', f"{minutes}:{seconds:02d}")
     
     def __str__(self) -> str:
         """Représentation textuelle de la piste"""
-        minutes, seconds = divmod(self.duration, 60)
-        return f"{self.title} [{minutes}:{seconds:02d}]"
-    
-    @property
-    def duration_formatted(self) -> str:
-        """Retourne la durée formatée (MM:SS)"""
-        minutes, seconds = divmod(self.duration, 60)
-        return f"{minutes}:{seconds:02d}"
+        return f"{self.title} [{self.duration_formatted}]"
@@ -1,6 +1,8 @@
 """Classe principale du bot Discord musical"""
 
 import asyncio
+import hashlib
+import json
 import logging
 from typing import Dict, Optional
 import discord
@@ -8,6 +10,8 @@ from discord.ext import commands
 
 from bot.config import Config
 from bot.audio.player import MusicPlayer
+from bot.audio.sources.youtube import YouTubeSource
+from bot.audio.sources.spotify import SpotifySource
 from bot.database.sqlite import SQLiteDatabase
 from bot.utils.exceptions import (
     MusicError,
@@ -26,6 +30,17 @@ logger = logging.getLogger(__name__)
 class MusicBot(commands.Bot):
     """Bot Discord musical avec support multi-serveur"""
     
+    # Couleur de l'embed par exception de musique (MusicError non listée: COLOR_ERROR)
+    _ERROR_COLORS = {
+        NotInVoiceChannel: Config.COLOR_ERROR,
+        BotNotConnected: Config.COLOR_ERROR,
+        TrackNotFound: Config.COLOR_ERROR,
+        PlaylistNotFound: Config.COLOR_ERROR,
+        ConnectionTimeout: Config.COLOR_ERROR,
+        QueueEmpty: Config.COLOR_WARNING,
+        InvalidVolume: Config.COLOR_ERROR,
+    }
+    
     def __init__(self):
         # Configuration des intents Discord
         intents = discord.Intents.default()
@@ -41,7 +56,16 @@ class MusicBot(commands.Bot):
         
         # Stockage des players par guild (serveur)
         # guild_id -> MusicPlayer
-        self.players: Dict[int, any] = {}
+        self.players: Dict[int, MusicPlayer] = {}
+        
+        # Timers de déconnexion quand le bot est seul dans un canal
+        # guild_id -> tâche en attente
+        self._alone_tasks: Dict[int, asyncio.Task] = {}
+        
+        # Source YouTube partagée par tous les players (instance yt-dlp et cache communs)
+        self.youtube_source = YouTubeSource()
+        # Client Spotify partagé (les commandes Spotify n'ont pas besoin d'un player)
+        self.spotify_source = SpotifySource()
         
         # Base de données pour les playlists
         self.db: Optional[SQLiteDatabase] = None
@@ -65,15 +89,45 @@ class MusicBot(commands.Bot):
                 for guild_id in Config.TEST_GUILDS:
                     guild = discord.Object(id=guild_id)
                     self.tree.copy_global_to(guild=guild)
-                    synced = await self.tree.sync(guild=guild)
-                    logger.info(f"✅ {len(synced)} commande(s) synchronisée(s) sur le serveur de test {guild_id}")
+                    synced = await self._sync_commands(guild)
+                    if synced is None:
+                        logger.info(f"Commandes déjà à jour sur le serveur de test {guild_id}")
+                    else:
+                        logger.info(f"✅ {synced} commande(s) synchronisée(s) sur le serveur de test {guild_id}")
             else:
                 # Sync global (peut prendre jusqu'à 1h)
-                synced = await self.tree.sync()
-                logger.info(f"✅ {len(synced)} commande(s) synchronisée(s) globalement")
+                synced = await self._sync_commands()
+                if synced is None:
+                    logger.info("Commandes déjà à jour globalement")
+                else:
+                    logger.info(f"✅ {synced} commande(s) synchronisée(s) globalement")
         except Exception as e:
             logger.error(f"❌ Erreur lors de la synchronisation des commandes: {e}")
         
+    async def _sync_commands(self, guild: Optional[discord.Object] = None) -> Optional[int]:
+        """
+        Synchronise les commandes slash si elles ont changé depuis la dernière fois
+        
+        L'empreinte des commandes envoyées est conservée en base : un redémarrage
+        sans modification des commandes n'appelle pas l'API Discord.
+        
+        Args:
+            guild: Serveur ciblé (None pour une synchronisation globale)
+            
+        Returns:
+            Nombre de commandes synchronisées, ou None si elles étaient à jour
+        """
+        payload = [command.to_dict(self.tree) for command in self.tree.get_commands(guild=guild)]
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        key = f"commands_hash:{guild.id if guild else 'global'}"
+        
+        if await self.db.get_setting(key) == digest:
+            return None
+        
+        synced = await self.tree.sync(guild=guild)
+        await self.db.set_setting(key, digest)
+        return len(synced)
+    
     async def _load_cogs(self):
         """Charge dynamiquement tous les cogs disponibles"""
         cogs_to_load = [
@@ -112,74 +166,12 @@ class MusicBot(commands.Bot):
         if isinstance(error, commands.CommandInvokeError):
             original_error = error.original
             
-            if isinstance(original_error, NotInVoiceChannel):
-                await ctx.send(
-                    embed=discord.Embed(
-                        description=f"❌ {original_error.message}",
-                        color=Config.COLOR_ERROR
-                    )
-                )
-                return
-            
-            elif isinstance(original_error, BotNotConnected):
-                await ctx.send(
-                    embed=discord.Embed(
-                        description=f"❌ {original_error.message}",
-                        color=Config.COLOR_ERROR
-                    )
-                )
-                return
-            
-            elif isinstance(original_error, TrackNotFound):
+            if isinstance(original_error, MusicError):
+                color = self._ERROR_COLORS.get(type(original_error), Config.COLOR_ERROR)
                 await ctx.send(
                     embed=discord.Embed(
                         description=f"❌ {original_error.message}",
-                        color=Config.COLOR_ERROR
-                    )
-                )
-                return
-            
-            elif isinstance(original_error, PlaylistNotFound):
-                await ctx.send(
-                    embed=discord.Embed(
-                        description=f"❌ {original_error.message}",
-                        color=Config.COLOR_ERROR
-                    )
-                )
-                return
-            
-            elif isinstance(original_error, ConnectionTimeout):
-                await ctx.send(
-                    embed=discord.Embed(
-                        description=f"❌ {original_error.message}",
-                        color=Config.COLOR_ERROR
-                    )
-                )
-                return
-            
-            elif isinstance(original_error, QueueEmpty):
-                await ctx.send(
-                    embed=discord.Embed(
-                        description=f"❌ {original_error.message}",
-                        color=Config.COLOR_WARNING
-                    )
-                )
-                return
-            
-            elif isinstance(original_error, InvalidVolume):
-                await ctx.send(
-                    embed=discord.Embed(
-                        description=f"❌ {original_error.message}",
-                        color=Config.COLOR_ERROR
-                    )
-                )
-                return
-            
-            elif isinstance(original_error, MusicError):
-                await ctx.send(
-                    embed=discord.Embed(
-                        description=f"❌ {original_error.message}",
-                        color=Config.COLOR_ERROR
+                        color=color
                     )
                 )
                 return
@@ -207,12 +199,11 @@ class MusicBot(commands.Bot):
     
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
         """Événement déclenché lors d'un changement d'état vocal"""
-        # Vérifier si le bot est dans un canal vocal sur ce serveur
-        if member.guild.id not in self.players:
+        # Vérifier si le bot est dans un canal vocal sur ce serveur (une seule recherche)
+        player = self.players.get(member.guild.id)
+        if player is None:
             return
         
-        player = self.players[member.guild.id]
-        
         # Vérifier si le bot est connecté
         if not player.is_connected() or not player.voice_client:
             return
@@ -220,51 +211,93 @@ class MusicBot(commands.Bot):
         # Obtenir le canal vocal du bot
         bot_channel = player.voice_client.channel
         
-        # Compter le nombre de membres (hors bots) dans le canal
-        members_in_channel = [m for m in bot_channel.members if not m.bot]
+        # Présence d'au moins un membre (hors bots) dans le canal, sans construire de liste
+        has_listeners = any(not m.bot for m in bot_channel.members)
         
-        # Si le bot est seul, démarrer un timer pour déconnexion
-        if len(members_in_channel) == 0:
-            logger.info(f"Bot seul dans le canal vocal - {member.guild.name}")
-            # Attendre le timeout avant de déconnecter
-            await asyncio.sleep(Config.ALONE_TIMEOUT)
-            
-            # Revérifier après le timeout
-            if player.is_connected() and player.voice_client:
-                bot_channel = player.voice_client.channel
-                members_in_channel = [m for m in bot_channel.members if not m.bot]
-                
-                if len(members_in_channel) == 0:
-                    logger.info(f"Déconnexion (seul dans le canal pendant {Config.ALONE_TIMEOUT}s) - {member.guild.name}")
-                    await player.disconnect()
+        # Si le bot est seul, démarrer un timer pour déconnexion (sans bloquer
+        # l'événement) ; l'annuler dès que quelqu'un est présent
+        guild_id = member.guild.id
+        task = self._alone_tasks.get(guild_id)
+        if not has_listeners:
+            if task is None or task.done():
+                logger.info(f"Bot seul dans le canal vocal - {member.guild.name}")
+                task = asyncio.create_task(self._alone_disconnect(player))
+                self._alone_tasks[guild_id] = task
+                task.add_done_callback(lambda t: self._forget_alone_task(guild_id, t))
+        elif task is not None:
+            task.cancel()
+    
+    async def _alone_disconnect(self, player: MusicPlayer) -> None:
+        """
+        Déconnecte le player s'il est toujours seul après Config.ALONE_TIMEOUT
+        
+        Args:
+            player: Player du serveur concerné
+        """
+        await asyncio.sleep(Config.ALONE_TIMEOUT)
+        
+        # Revérifier après le timeout
+        if player.is_connected() and player.voice_client:
+            bot_channel = player.voice_client.channel
+            if not any(not m.bot for m in bot_channel.members):
+                logger.info(f"Déconnexion (seul dans le canal pendant {Config.ALONE_TIMEOUT}s) - {player.guild.name}")
+                await player.disconnect()
+    
+    def _forget_alone_task(self, guild_id: int, task: asyncio.Task) -> None:
+        """Retire un timer terminé du registre (s'il n'a pas été remplacé)"""
+        if self._alone_tasks.get(guild_id) is task:
+            del self._alone_tasks[guild_id]
     
     async def on_guild_remove(self, guild: discord.Guild):
         """Événement déclenché quand le bot quitte un serveur"""
         logger.info(f"Bot retiré du serveur: {guild.name} (ID: {guild.id})")
         
-        # Nettoyer le player associé si existant
-        if guild.id in self.players:
-            await self.players[guild.id].disconnect()
-            del self.players[guild.id]
+        # Nettoyer le player associé si existant (la déconnexion le retire du registre)
+        player = self.players.get(guild.id)
+        if player is not None:
+            await player.disconnect()
     
     def get_player(self, guild: discord.Guild) -> MusicPlayer:
         """Récupère ou crée un player pour un serveur"""
-        if guild.id not in self.players:
-            self.players[guild.id] = MusicPlayer(self, guild)
+        player = self.players.get(guild.id)
+        if player is None:
+            player = self.players[guild.id] = MusicPlayer(self, guild)
             logger.info(f"Player créé pour le serveur: {guild.name}")
         
-        return self.players[guild.id]
+        return player
+    
+    def release_player(self, player: MusicPlayer) -> None:
+        """
+        Retire un player du registre (appelé à sa déconnexion)
+        
+        Args:
+            player: Player à libérer
+        """
+        if self.players.get(player.guild.id) is player:
+            del self.players[player.guild.id]
+            logger.info(f"Player libéré pour le serveur: {player.guild.name}")
     
     async def close(self):
         """Fermeture propre du bot"""
         logger.info("Fermeture du bot...")
         
-        # Déconnecter tous les players
-        for player in self.players.values():
-            await player.disconnect()
+        # Annuler les timers de déconnexion en attente
+        for task in list(self._alone_tasks.values()):
+            task.cancel()
+        
+        # Déconnecter tous les players en parallèle (copie : chaque déconnexion libère son entrée)
+        await asyncio.gather(
+            *(player.disconnect() for player in list(self.players.values())),
+            return_exceptions=True
+        )
+        self.players.clear()
+        
+        # Décharge les cogs (qui écrivent leurs données en attente) avant de fermer la base
+        await super().close()
+        
+        # Arrêter les threads d'extraction YouTube
+        await self.youtube_source.close()
         
         # Fermer la base de données
         if self.db:
             await self.db.close()
-        
-        await super().close()
@@ -1,6 +1,9 @@
 """Cog de commandes IA pour le bot Discord"""
 
+import asyncio
+import functools
 import logging
+import time
 from typing import Optional
 import discord
 from discord import app_commands
@@ -14,9 +17,33 @@ from bot.ai.conversation_manager import ConversationManager
 logger = logging.getLogger(__name__)
 
 
+def _ai_disabled_embed() -> discord.Embed:
+    """Embed de réponse quand l'IA n'est pas configurée"""
+    return discord.Embed(
+        description="❌ L'IA n'est pas configurée sur ce bot.",
+        color=Config.COLOR_ERROR
+    )
+
+
+def require_ai(func):
+    """Décorateur de commande : refuse l'exécution si l'IA n'est pas disponible"""
+    @functools.wraps(func)
+    async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+        # Composants IA non initialisés (Mistral absent ou en erreur au chargement)
+        if self.mistral_client is None:
+            await interaction.response.send_message(embed=_ai_disabled_embed(), ephemeral=True)
+            return
+        return await func(self, interaction, *args, **kwargs)
+    
+    return wrapper
+
+
 class AI(commands.Cog):
     """Commandes de chatbot IA avec Mistral"""
     
+    # Intervalle minimal entre deux éditions de la réponse en cours (limite d'édition Discord)
+    STREAM_EDIT_INTERVAL = 1.0
+    
     def __init__(self, bot):
         self.bot = bot
         self.mistral_client: Optional[MistralClient] = None
@@ -31,28 +58,28 @@ class AI(commands.Cog):
                 self.conversation_manager = ConversationManager(bot.db, max_history=50)
                 logger.info("Composants IA initialisés avec succès")
             except Exception as e:
-                logger.error(f"Erreur lors de l'initialisation des composants IA: {e}")
+                logger.error("Erreur lors de l'initialisation des composants IA: %s", e)
         else:
             logger.warning("Mistral non configuré - Commandes IA désactivées")
     
-    def _check_ai_available(self) -> bool:
-        """Vérifie si l'IA est disponible"""
-        return self.mistral_client is not None
+    async def cog_unload(self):
+        """Écrit l'historique en attente et ferme le client Mistral avant le déchargement du cog"""
+        if self.conversation_manager:
+            await self.conversation_manager.flush()
+        if self.mistral_client:
+            await self.mistral_client.close()
     
     @app_commands.command(name="chat", description="Discute avec l'IA")
     @app_commands.describe(message="Ton message pour l'IA")
+    @require_ai
     async def chat(self, interaction: discord.Interaction, message: str):
-        """Envoie un message au chatbot IA"""
-        if not self._check_ai_available():
-            await interaction.response.send_message(
-                embed=discord.Embed(
-                    description="❌ L'IA n'est pas configurée sur ce bot.",
-                    color=Config.COLOR_ERROR
-                ),
-                ephemeral=True
-            )
-            return
+        """
+        Envoie un message au chatbot IA
         
+        Le prompt système est la chaîne du template actif, mise en cache par
+        TemplateManager : elle reste identique d'un appel à l'autre, ce dont
+        dépendent les caches de MistralClient et le cache de préfixe de Mistral.
+        """
         await interaction.response.defer()
         
         try:
@@ -61,47 +88,46 @@ class AI(commands.Cog):
             user_id = interaction.user.id
             username = interaction.user.display_name
             
-            # Récupérer le template actif
-            system_prompt = await self.template_manager.get_active_template(guild_id)
-            
-            # Récupérer l'historique de conversation
-            history = await self.conversation_manager.get_history(guild_id, channel_id, limit=20)
+            # Récupérer le template actif et l'historique (au format API) en parallèle
+            system_prompt, api_messages = await asyncio.gather(
+                self.template_manager.get_active_template(guild_id),
+                self.conversation_manager.get_api_messages(guild_id, channel_id, limit=20)
+            )
             
             # Ajouter le pseudo devant le message pour le contexte
             message_with_username = f"{username}: {message}"
             
-            # Ajouter le message de l'utilisateur à l'historique
-            await self.conversation_manager.add_message(
-                guild_id, channel_id, user_id, "user", message_with_username
-            )
-            
-            # Formater l'historique pour l'API
-            api_messages = self.conversation_manager.format_for_api(history)
-            
             # Ajouter le nouveau message avec le pseudo
             api_messages.append({"role": "user", "content": message_with_username})
 
-            # Obtenir la réponse de l'IA
-            response = await self.mistral_client.chat_completion(api_messages, system_prompt)
+            # Obtenir la réponse de l'IA en l'affichant au fur et à mesure (le premier
+            # message est édité au plus une fois par STREAM_EDIT_INTERVAL)
+            parts = []
+            length = 0
+            last_edit = time.monotonic()
+            async for part in self.mistral_client.chat_completion_stream(api_messages, system_prompt, guild_id):
+                parts.append(part)
+                length += len(part)
+                now = time.monotonic()
+                if length <= 2000 and now - last_edit >= self.STREAM_EDIT_INTERVAL:
+                    await interaction.edit_original_response(content="".join(parts))
+                    last_edit = now
+            response = "".join(parts)
             
-            # Sauvegarder la réponse dans l'historique
-            await self.conversation_manager.add_message(
-                guild_id, channel_id, self.bot.user.id, "assistant", response
-            )
+            # Afficher la réponse complète (limite Discord de 2000 caractères par message)
+            await interaction.edit_original_response(content=response[:2000])
             
-            # Envoyer la réponse
-            # Si la réponse est trop longue, la diviser
-            if len(response) > 2000:
-                # Envoyer en plusieurs messages
-                chunks = [response[i:i+2000] for i in range(0, len(response), 2000)]
-                await interaction.followup.send(chunks[0])
-                for chunk in chunks[1:]:
-                    await interaction.channel.send(chunk)
-            else:
-                await interaction.followup.send(response)
+            # Sauvegarder la question et la réponse dans l'historique une fois la réponse
+            # affichée (écriture différée, une seule transaction)
+            await self.conversation_manager.add_exchange(
+                guild_id, channel_id, user_id, self.bot.user.id, message_with_username, response
+            )
+            # Si la réponse est trop longue, envoyer la suite morceau par morceau
+            for i in range(2000, len(response), 2000):
+                await interaction.channel.send(response[i:i+2000])
             
         except Exception as e:
-            logger.error(f"Erreur lors du chat IA: {e}")
+            logger.error("Erreur lors du chat IA: %s", e)
             await interaction.followup.send(
                 embed=discord.Embed(
                     description=f"❌ Erreur lors de la communication avec l'IA: {str(e)}",
@@ -117,18 +143,9 @@ class AI(commands.Cog):
     )
     
     @template_group.command(name="list", description="Liste tous les templates IA du serveur")
+    @require_ai
     async def template_list(self, interaction: discord.Interaction):
         """Liste tous les templates IA"""
-        if not self._check_ai_available():
-            await interaction.response.send_message(
-                embed=discord.Embed(
-                    description="❌ L'IA n'est pas configurée sur ce bot.",
-                    color=Config.COLOR_ERROR
-                ),
-                ephemeral=True
-            )
-            return
-        
         try:
             templates = await self.template_manager.list_templates(interaction.guild_id)
             
@@ -141,26 +158,34 @@ class AI(commands.Cog):
                 )
                 return
             
-            # Créer l'embed avec la liste des templates
+            # Construire la liste dans la description (un seul champ, pas de limite de 25 champs)
+            header = f"{len(templates)} template(s) configuré(s)\n"
+            length = len(header)
+            lines = []
+            for index, template in enumerate(templates):
+                status = "✅ Actif" if template.is_active else "⚪ Inactif"
+                prompt = template.system_prompt
+                preview = prompt if len(prompt) <= 100 else f"{prompt[:100]}..."
+                line = f"\n**{status} - {template.name}**\n```{preview}```"
+                
+                # Limite Discord de 4096 caractères pour la description
+                remaining = f"\n… et {len(templates) - index} autre(s)"
+                if length + len(line) + len(remaining) > 4096:
+                    lines.append(remaining)
+                    break
+                lines.append(line)
+                length += len(line)
+            
             embed = discord.Embed(
                 title="📝 Templates IA",
-                description=f"{len(templates)} template(s) configuré(s)",
+                description=header + "".join(lines),
                 color=Config.COLOR_PRIMARY
             )
             
-            for template in templates:
-                status = "✅ Actif" if template.is_active else "⚪ Inactif"
-                preview = template.system_prompt[:100] + "..." if len(template.system_prompt) > 100 else template.system_prompt
-                embed.add_field(
-                    name=f"{status} - {template.name}",
-                    value=f"```{preview}```",
-                    inline=False
-                )
-            
             await interaction.response.send_message(embed=embed)
             
         except Exception as e:
-            logger.error(f"Erreur lors de la liste des templates: {e}")
+            logger.error("Erreur lors de la liste des templates: %s", e)
             await interaction.response.send_message(
                 embed=discord.Embed(
                     description=f"❌ Erreur: {str(e)}",
@@ -176,6 +201,7 @@ class AI(commands.Cog):
         set_active="Activer immédiatement ce template"
     )
     @app_commands.default_permissions(manage_guild=True)
+    @require_ai
     async def template_create(
         self,
         interaction: discord.Interaction,
@@ -184,16 +210,6 @@ class AI(commands.Cog):
         set_active: bool = False
     ):
         """Crée un nouveau template IA"""
-        if not self._check_ai_available():
-            await interaction.response.send_message(
-                embed=discord.Embed(
-                    description="❌ L'IA n'est pas configurée sur ce bot.",
-                    color=Config.COLOR_ERROR
-                ),
-                ephemeral=True
-            )
-            return
-        
         try:
             template = await self.template_manager.create_template(
                 interaction.guild_id,
@@ -219,7 +235,7 @@ class AI(commands.Cog):
                 ephemeral=True
             )
         except Exception as e:
-            logger.error(f"Erreur lors de la création du template: {e}")
+            logger.error("Erreur lors de la création du template: %s", e)
             await interaction.response.send_message(
                 embed=discord.Embed(
                     description=f"❌ Erreur: {str(e)}",
@@ -231,22 +247,12 @@ class AI(commands.Cog):
     @template_group.command(name="set", description="Active un template IA")
     @app_commands.describe(name="Nom du template à activer")
     @app_commands.default_permissions(manage_guild=True)
+    @require_ai
     async def template_set(self, interaction: discord.Interaction, name: str):
         """Active un template IA"""
-        if not self._check_ai_available():
-            await interaction.response.send_message(
-                embed=discord.Embed(
-                    description="❌ L'IA n'est pas configurée sur ce bot.",
-                    color=Config.COLOR_ERROR
-                ),
-                ephemeral=True
-            )
-            return
-        
         try:
             # Trouver le template par nom
-            templates = await self.template_manager.list_templates(interaction.guild_id)
-            template = next((t for t in templates if t.name == name), None)
+            template = await self.template_manager.get_by_name(interaction.guild_id, name)
             
             if not template:
                 await interaction.response.send_message(
@@ -269,7 +275,7 @@ class AI(commands.Cog):
             )
             
         except Exception as e:
-            logger.error(f"Erreur lors de l'activation du template: {e}")
+            logger.error("Erreur lors de l'activation du template: %s", e)
             await interaction.response.send_message(
                 embed=discord.Embed(
                     description=f"❌ Erreur: {str(e)}",
@@ -281,22 +287,12 @@ class AI(commands.Cog):
     @template_group.command(name="delete", description="Supprime un template IA")
     @app_commands.describe(name="Nom du template à supprimer")
     @app_commands.default_permissions(manage_guild=True)
+    @require_ai
     async def template_delete(self, interaction: discord.Interaction, name: str):
         """Supprime un template IA"""
-        if not self._check_ai_available():
-            await interaction.response.send_message(
-                embed=discord.Embed(
-                    description="❌ L'IA n'est pas configurée sur ce bot.",
-                    color=Config.COLOR_ERROR
-                ),
-                ephemeral=True
-            )
-            return
-        
         try:
             # Trouver le template par nom
-            templates = await self.template_manager.list_templates(interaction.guild_id)
-            template = next((t for t in templates if t.name == name), None)
+            template = await self.template_manager.get_by_name(interaction.guild_id, name)
             
             if not template:
                 await interaction.response.send_message(
@@ -319,7 +315,7 @@ class AI(commands.Cog):
             )
             
         except Exception as e:
-            logger.error(f"Erreur lors de la suppression du template: {e}")
+            logger.error("Erreur lors de la suppression du template: %s", e)
             await interaction.response.send_message(
                 embed=discord.Embed(
                     description=f"❌ Erreur: {str(e)}",
@@ -329,18 +325,9 @@ class AI(commands.Cog):
             )
     
     @app_commands.command(name="ai_clear", description="Efface l'historique de conversation IA")
+    @require_ai
     async def ai_clear(self, interaction: discord.Interaction):
         """Efface l'historique de conversation"""
-        if not self._check_ai_available():
-            await interaction.response.send_message(
-                embed=discord.Embed(
-                    description="❌ L'IA n'est pas configurée sur ce bot.",
-                    color=Config.COLOR_ERROR
-                ),
-                ephemeral=True
-            )
-            return
-        
         try:
             await self.conversation_manager.clear_history(
                 interaction.guild_id,
@@ -355,7 +342,7 @@ class AI(commands.Cog):
             )
             
         except Exception as e:
-            logger.error(f"Erreur lors de l'effacement de l'historique: {e}")
+            logger.error("Erreur lors de l'effacement de l'historique: %s", e)
             await interaction.response.send_message(
                 embed=discord.Embed(
                     description=f"❌ Erreur: {str(e)}",
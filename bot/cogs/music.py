@@ -1,15 +1,20 @@
 """Cog de commandes musicales pour le bot Discord"""
 
+import functools
+import inspect
 import logging
+from dataclasses import replace
 from typing import Optional
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from bot.config import Config
 from bot.audio.player import MusicPlayer
 from bot.utils.embeds import MusicEmbeds, create_progress_bar
 from bot.utils.views import MusicControlView, QueuePaginationView
 from bot.utils.exceptions import (
+    MusicError,
     NotInVoiceChannel,
     BotNotConnected,
     TrackNotFound,
@@ -20,26 +25,142 @@ from bot.utils.exceptions import (
 logger = logging.getLogger(__name__)
 
 
+def _build_help_embed() -> discord.Embed:
+    """
+    Construit l'embed de /help (contenu statique)
+    
+    Returns:
+        Embed Discord formaté
+    """
+    embed = discord.Embed(
+        title="🎵 Bot Musical - Aide",
+        description="Voici comment utiliser les commandes slash :",
+        color=Config.COLOR_INFO
+    )
+    
+    embed.add_field(
+        name="📖 Comment utiliser les commandes",
+        value="Tapez `/` dans le chat pour voir toutes les commandes disponibles.\n"
+              "Discord vous montrera automatiquement les paramètres requis et leur description.",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🎵 Commandes Musicales",
+        value="`/play` - Joue une musique\n"
+              "`/pause` - Met en pause\n"
+              "`/resume` - Reprend la lecture\n"
+              "`/skip` - Passe à la piste suivante\n"
+              "`/stop` - Arrête et vide la queue\n"
+              "`/queue` - Affiche la file d'attente\n"
+              "`/nowplaying` - Piste en cours\n"
+              "`/volume` - Règle le volume\n"
+              "`/loop` - Active/désactive la répétition\n"
+              "`/shuffle` - Mélange la queue\n"
+              "`/clear` - Vide la queue\n"
+              "`/remove` - Retire une piste\n"
+              "`/move` - Déplace une piste\n"
+              "`/disconnect` - Déconnecte le bot",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="📋 Commandes Playlist",
+        value="`/save_playlist` - Sauvegarde la queue\n"
+              "`/load_playlist` - Charge une playlist\n"
+              "`/list_playlists` - Liste les playlists\n"
+              "`/playlist_info` - Détails d'une playlist\n"
+              "`/remove_playlist` - Supprime une playlist\n"
+              "`/save_spotify_playlist` - Importe depuis Spotify",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🤖 Commandes IA",
+        value="`/chat` - Discute avec l'IA\n"
+              "`/ai_template list` - Liste les templates IA\n"
+              "`/ai_template create` - Crée un template IA\n"
+              "`/ai_template set` - Active un template\n"
+              "`/ai_template delete` - Supprime un template\n"
+              "`/ai_clear` - Efface l'historique de conversation",
+        inline=False
+    )
+    
+    embed.set_footer(text="💡 Astuce : Utilisez l'auto-complétion pour voir les paramètres de chaque commande")
+    
+    return embed
+
+
+# Réponses constantes, construites une seule fois (discord.py ne modifie pas un embed envoyé)
+_HELP_EMBED = _build_help_embed()
+_ERR_NOT_CONNECTED = MusicEmbeds.error("Le bot n'est pas connecté à un canal vocal.")
+_ERR_NOT_PLAYING = MusicEmbeds.error("Aucune musique n'est en cours de lecture.")
+_ERR_QUEUE_EMPTY = MusicEmbeds.error("La file d'attente est vide.")
+_EMPTY_QUEUE_EMBED = discord.Embed(
+    title="📋 File d'attente",
+    description="La file d'attente est vide.",
+    color=Config.COLOR_INFO
+)
+
+
+def requires_connection(func):
+    """
+    Décorateur de commande : exige que le bot soit connecté à un canal vocal
+    
+    Le player du serveur est passé à la commande juste après l'interaction ;
+    aucun player n'est créé pour un serveur où le bot n'est pas connecté.
+    """
+    @functools.wraps(func)
+    async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+        player = self.bot.players.get(interaction.guild_id)
+        if player is None or not player.is_connected():
+            await interaction.response.send_message(
+                embed=_ERR_NOT_CONNECTED,
+                ephemeral=True
+            )
+            return
+        return await func(self, interaction, player, *args, **kwargs)
+    
+    # Signature vue par discord.py : sans le paramètre `player` (pas une option de commande)
+    signature = inspect.signature(func)
+    wrapper.__signature__ = signature.replace(
+        parameters=[param for name, param in signature.parameters.items() if name != 'player']
+    )
+    return wrapper
+
+
 class Music(commands.Cog):
     """Commandes de lecture musicale"""
     
+    # Nombre maximum de pistes chargées depuis une playlist ou un album Spotify
+    MAX_SPOTIFY_TRACKS = 50
+    
     def __init__(self, bot):
         self.bot = bot
     
     def _get_player(self, interaction: discord.Interaction) -> MusicPlayer:
-        """Récupère le player pour le serveur actuel"""
+        """
+        Récupère ou crée le player pour le serveur actuel
+        
+        Réservé aux chemins qui connectent le bot : les autres commandes lisent
+        self.bot.players pour ne pas enregistrer de player inutilisé.
+        """
         return self.bot.get_player(interaction.guild)
     
-    async def _ensure_voice(self, interaction: discord.Interaction) -> bool:
+    async def _ensure_voice(self, interaction: discord.Interaction) -> MusicPlayer:
         """
         Vérifie que l'utilisateur et le bot sont dans un canal vocal
         
+        N'envoie aucune réponse : l'appelant a déjà différé l'interaction et
+        affiche l'erreur levée.
+        
         Returns:
-            True si tout est OK
+            Player du serveur, connecté au canal vocal
             
         Raises:
             NotInVoiceChannel: Si l'utilisateur n'est pas dans un canal vocal
             ConnectionTimeout: Si la connexion au canal vocal timeout
+            BotNotConnected: Si la connexion au canal vocal échoue
         """
         # Vérifier que l'utilisateur est dans un canal vocal
         if not interaction.user.voice:
@@ -52,107 +173,42 @@ class Music(commands.Cog):
             # ConnectionTimeout sera propagée si timeout
             success = await player.connect(interaction.user.voice.channel)
             if not success:
-                await interaction.response.send_message(
-                    embed=MusicEmbeds.error("Impossible de se connecter au canal vocal."),
-                    ephemeral=True
-                )
-                return False
+                raise BotNotConnected("Impossible de se connecter au canal vocal.")
         
-        return True
+        return player
     
     @app_commands.command(name="help", description="Affiche l'aide et la liste des commandes")
     async def help(self, interaction: discord.Interaction):
         """Affiche l'aide pour utiliser le bot"""
-        embed = discord.Embed(
-            title="🎵 Bot Musical - Aide",
-            description="Voici comment utiliser les commandes slash :",
-            color=MusicEmbeds.info("").color
-        )
-        
-        embed.add_field(
-            name="📖 Comment utiliser les commandes",
-            value="Tapez `/` dans le chat pour voir toutes les commandes disponibles.\n"
-                  "Discord vous montrera automatiquement les paramètres requis et leur description.",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🎵 Commandes Musicales",
-            value="`/play` - Joue une musique\n"
-                  "`/pause` - Met en pause\n"
-                  "`/resume` - Reprend la lecture\n"
-                  "`/skip` - Passe à la piste suivante\n"
-                  "`/stop` - Arrête et vide la queue\n"
-                  "`/queue` - Affiche la file d'attente\n"
-                  "`/nowplaying` - Piste en cours\n"
-                  "`/volume` - Règle le volume\n"
-                  "`/loop` - Active/désactive la répétition\n"
-                  "`/shuffle` - Mélange la queue\n"
-                  "`/clear` - Vide la queue\n"
-                  "`/remove` - Retire une piste\n"
-                  "`/move` - Déplace une piste\n"
-                  "`/disconnect` - Déconnecte le bot",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="📋 Commandes Playlist",
-            value="`/save_playlist` - Sauvegarde la queue\n"
-                  "`/load_playlist` - Charge une playlist\n"
-                  "`/list_playlists` - Liste les playlists\n"
-                  "`/playlist_info` - Détails d'une playlist\n"
-                  "`/remove_playlist` - Supprime une playlist\n"
-                  "`/save_spotify_playlist` - Importe depuis Spotify",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🤖 Commandes IA",
-            value="`/chat` - Discute avec l'IA\n"
-                  "`/ai_template list` - Liste les templates IA\n"
-                  "`/ai_template create` - Crée un template IA\n"
-                  "`/ai_template set` - Active un template\n"
-                  "`/ai_template delete` - Supprime un template\n"
-                  "`/ai_clear` - Efface l'historique de conversation",
-            inline=False
-        )
-        
-        embed.set_footer(text="💡 Astuce : Utilisez l'auto-complétion pour voir les paramètres de chaque commande")
-        
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=_HELP_EMBED, ephemeral=True)
     
     
     @app_commands.command(name="play", description="Joue une musique depuis YouTube/Spotify")
     @app_commands.describe(query="URL YouTube/Spotify ou terme de recherche")
     async def play(self, interaction: discord.Interaction, query: str):
         """Joue une musique depuis YouTube/Spotify ou l'ajoute à la queue"""
-        # Vérifier les conditions vocales
-        if not await self._ensure_voice(interaction):
-            return
-        
-        player = self._get_player(interaction)
-        
-        # Defer la réponse car la recherche peut prendre du temps
+        # Defer la réponse immédiatement : la connexion vocale et la recherche
+        # peuvent dépasser le délai de 3 secondes accordé par Discord
         await interaction.response.defer()
         
         try:
-            # Vérifier si c'est une URL Spotify
-            if player.spotify_source.is_spotify_url(query):
+            # Vérifier les conditions vocales (connexion au canal si nécessaire)
+            player = await self._ensure_voice(interaction)
+            
+            # Les termes de recherche (cas le plus courant) ne passent pas par le pattern
+            # Spotify : un simple test de sous-chaîne suffit à les écarter (avec ou sans schéma)
+            is_spotify = player.spotify_source.is_spotify_url(query)
+            
+            # Vérifier si c'est une URL Spotify (détection et type du lien en une passe)
+            spotify_link = player.spotify_source.extract_id_from_url(query) if is_spotify else None
+            if spotify_link:
                 if not player.spotify_source.is_available():
                     await interaction.followup.send(embed=MusicEmbeds.error(
                         "L'intégration Spotify n'est pas configurée. Veuillez configurer SPOTIFY_CLIENT_ID et SPOTIFY_CLIENT_SECRET."
                     ))
                     return
                 
-                # Déterminer le type de lien Spotify
-                result = player.spotify_source.extract_id_from_url(query)
-                if not result:
-                    await interaction.followup.send(embed=MusicEmbeds.error(
-                        "URL Spotify invalide."
-                    ))
-                    return
-                
-                spotify_type, spotify_id = result
+                spotify_type, spotify_id = spotify_link
                 
                 # Traiter selon le type
                 if spotify_type == 'track':
@@ -173,7 +229,7 @@ class Music(commands.Cog):
                         return
                     
                     # Mettre à jour la source pour indiquer Spotify
-                    track.source = 'spotify'
+                    track = replace(track, source='spotify')
                     
                     # Ajouter à la queue
                     position = await player.add_track(track)
@@ -198,31 +254,48 @@ class Music(commands.Cog):
                         ))
                         return
                     
-                    # Convertir et ajouter toutes les pistes
+                    # Rechercher les pistes sur YouTube en parallèle et les ajouter dès qu'elles
+                    # sont trouvées (ordre conservé) : la lecture démarre sans attendre la fin
+                    loading_msg = await interaction.followup.send(embed=MusicEmbeds.info(
+                        f"⏳ Chargement de la {type_name} Spotify en arrière-plan...",
+                        "Chargement"
+                    ))
+                    
                     added_count = 0
-                    for spotify_track in spotify_tracks[:50]:  # Limiter à 50 pistes
-                        # Vérifier si le player est toujours connecté
-                        if not player.is_connected():
-                            logger.info(f"Chargement de playlist interrompu (déconnexion) après {added_count} pistes")
-                            break
-                        
-                        track = await player.youtube_source.search(spotify_track.search_query, interaction.user)
-                        if track:
-                            track.source = 'spotify'
-                            await player.add_track(track)
-                            added_count += 1
+                    queries = [
+                        spotify_track.search_query
+                        for spotify_track in spotify_tracks[:self.MAX_SPOTIFY_TRACKS]
+                    ]
+                    results = player.youtube_source.search_iter(queries, interaction.user)
+                    try:
+                        async for track in results:
+                            if not player.is_connected():
+                                logger.info("Chargement de playlist interrompu (déconnexion)")
+                                break
+                            if track:
+                                await player.add_track(replace(track, source='spotify'))
+                                added_count += 1
+                    finally:
+                        # Annule les recherches restantes en cas d'interruption
+                        await results.aclose()
                     
                     if added_count > 0:
-                        await interaction.followup.send(embed=MusicEmbeds.success(
+                        await loading_msg.edit(embed=MusicEmbeds.success(
                             f"✅ {added_count} piste(s) ajoutée(s) depuis la {type_name} Spotify.",
                             f"{type_name.capitalize()} chargée"
                         ))
                     else:
-                        await interaction.followup.send(embed=MusicEmbeds.warning(
+                        await loading_msg.edit(embed=MusicEmbeds.warning(
                             "Chargement interrompu.",
                             "Annulé"
                         ))
             
+            # Lien Spotify d'un type non supporté (artiste, épisode...)
+            elif is_spotify:
+                await interaction.followup.send(embed=MusicEmbeds.error(
+                    "URL Spotify invalide."
+                ))
+            
             # Vérifier si c'est une playlist YouTube
             elif player.youtube_source.is_youtube_playlist_url(query):
                 # Extraire toutes les vidéos de la playlist
@@ -234,16 +307,13 @@ class Music(commands.Cog):
                     ))
                     return
                 
-                # Ajouter toutes les pistes
+                # Ajouter toutes les pistes en un seul lot
                 added_count = 0
-                for track in youtube_tracks:
-                    # Vérifier si le player est toujours connecté
-                    if not player.is_connected():
-                        logger.info(f"Chargement de playlist interrompu (déconnexion) après {added_count} pistes")
-                        break
-                    
-                    await player.add_track(track)
-                    added_count += 1
+                if player.is_connected():
+                    await player.add_tracks(youtube_tracks)
+                    added_count = len(youtube_tracks)
+                else:
+                    logger.info("Chargement de playlist interrompu (déconnexion)")
                 
                 if added_count > 0:
                     await interaction.followup.send(embed=MusicEmbeds.success(
@@ -275,6 +345,8 @@ class Music(commands.Cog):
                 else:
                     await interaction.followup.send(embed=MusicEmbeds.added_to_queue(track, position))
             
+        except MusicError as e:
+            await interaction.followup.send(embed=MusicEmbeds.error(e.message))
         except Exception as e:
             logger.error(f"Erreur lors de la lecture: {e}")
             await interaction.followup.send(embed=MusicEmbeds.error(
@@ -282,39 +354,23 @@ class Music(commands.Cog):
             ))
     
     @app_commands.command(name="pause", description="Met en pause la lecture en cours")
-    async def pause(self, interaction: discord.Interaction):
+    @requires_connection
+    async def pause(self, interaction: discord.Interaction, player: MusicPlayer):
         """Met en pause la lecture en cours"""
-        player = self._get_player(interaction)
-        
-        if not player.is_connected():
-            await interaction.response.send_message(
-                embed=MusicEmbeds.error("Le bot n'est pas connecté à un canal vocal."),
-                ephemeral=True
-            )
-            return
-        
         if await player.pause():
             await interaction.response.send_message(
                 embed=MusicEmbeds.success("⏸️ Lecture mise en pause.")
             )
         else:
             await interaction.response.send_message(
-                embed=MusicEmbeds.error("Aucune musique n'est en cours de lecture."),
+                embed=_ERR_NOT_PLAYING,
                 ephemeral=True
             )
     
     @app_commands.command(name="resume", description="Reprend la lecture en pause")
-    async def resume(self, interaction: discord.Interaction):
+    @requires_connection
+    async def resume(self, interaction: discord.Interaction, player: MusicPlayer):
         """Reprend la lecture en pause"""
-        player = self._get_player(interaction)
-        
-        if not player.is_connected():
-            await interaction.response.send_message(
-                embed=MusicEmbeds.error("Le bot n'est pas connecté à un canal vocal."),
-                ephemeral=True
-            )
-            return
-        
         if await player.resume():
             await interaction.response.send_message(
                 embed=MusicEmbeds.success("▶️ Lecture reprise.")
@@ -326,39 +382,23 @@ class Music(commands.Cog):
             )
     
     @app_commands.command(name="skip", description="Passe à la piste suivante")
-    async def skip(self, interaction: discord.Interaction):
+    @requires_connection
+    async def skip(self, interaction: discord.Interaction, player: MusicPlayer):
         """Passe à la piste suivante"""
-        player = self._get_player(interaction)
-        
-        if not player.is_connected():
-            await interaction.response.send_message(
-                embed=MusicEmbeds.error("Le bot n'est pas connecté à un canal vocal."),
-                ephemeral=True
-            )
-            return
-        
         if await player.skip():
             await interaction.response.send_message(
                 embed=MusicEmbeds.success("⏭️ Piste passée.")
             )
         else:
             await interaction.response.send_message(
-                embed=MusicEmbeds.error("Aucune musique n'est en cours de lecture."),
+                embed=_ERR_NOT_PLAYING,
                 ephemeral=True
             )
     
     @app_commands.command(name="stop", description="Arrête la lecture et vide la queue")
-    async def stop(self, interaction: discord.Interaction):
+    @requires_connection
+    async def stop(self, interaction: discord.Interaction, player: MusicPlayer):
         """Arrête la lecture et vide la queue"""
-        player = self._get_player(interaction)
-        
-        if not player.is_connected():
-            await interaction.response.send_message(
-                embed=MusicEmbeds.error("Le bot n'est pas connecté à un canal vocal."),
-                ephemeral=True
-            )
-            return
-        
         await player.stop()
         await interaction.response.send_message(
             embed=MusicEmbeds.success("⏹️ Lecture arrêtée et file d'attente vidée.")
@@ -372,32 +412,33 @@ class Music(commands.Cog):
         
         Usage: !queue [page]
         """
-        player = self._get_player(interaction)
+        player = self.bot.players.get(interaction.guild_id)
+        
+        # Rien à afficher : réponse constante, sans construire de liste
+        queue_size = player.queue.size() if player else 0
+        if queue_size == 0 and not (player and player.current):
+            await interaction.response.send_message(embed=_EMPTY_QUEUE_EMBED)
+            return
         
         # Calculer le nombre total de pages
-        queue_size = await player.queue.size()
         items_per_page = 10
         total_pages = max(1, (queue_size + items_per_page - 1) // items_per_page)
         
-        # Créer les embeds pour toutes les pages
-        embeds = []
-        for p in range(1, total_pages + 1):
-            embed = await MusicEmbeds.queue_list(
+        # Si une seule page, pas besoin de pagination
+        if total_pages == 1:
+            embed = await MusicEmbeds.queue_list(player.queue, player.current, 1)
+            await interaction.response.send_message(embed=embed)
+        else:
+            # Créer la vue avec pagination : seule la page demandée est construite,
+            # les autres le sont à la demande
+            view = QueuePaginationView(
                 player.queue,
                 player.current,
-                p
+                total_pages,
+                initial_page=max(0, min(page - 1, total_pages - 1))
             )
-            embeds.append(embed)
-        
-        # Si une seule page, pas besoin de pagination
-        if len(embeds) == 1:
-            await interaction.response.send_message(embed=embeds[0])
-        else:
-            # Créer la vue avec pagination
-            view = QueuePaginationView(embeds)
-            view.current_page = max(0, min(page - 1, len(embeds) - 1))
-            view._update_buttons()
-            message = await interaction.response.send_message(embed=embeds[view.current_page], view=view)
+            embed = await view.get_embed(view.current_page)
+            message = await interaction.response.send_message(embed=embed, view=view)
             view.message = message
     
     @app_commands.command(name="nowplaying", description="Affiche la piste en cours")
@@ -407,9 +448,9 @@ class Music(commands.Cog):
         
         Usage: !nowplaying
         """
-        player = self._get_player(interaction)
+        player = self.bot.players.get(interaction.guild_id)
         
-        if not player.current:
+        if player is None or not player.current:
             await interaction.response.send_message(embed=MusicEmbeds.info(
                 "Aucune musique n'est en cours de lecture."
             ))
@@ -433,14 +474,13 @@ class Music(commands.Cog):
     
     @app_commands.command(name="volume", description="Règle le volume (0-100)")
     @app_commands.describe(volume="Niveau de volume (0-100)")
-    async def volume(self, interaction: discord.Interaction, volume: int):
+    @requires_connection
+    async def volume(self, interaction: discord.Interaction, player: MusicPlayer, volume: int):
         """
         Règle le volume de lecture (0-100)
         
         Usage: !volume <0-100>
         """
-        player = self._get_player(interaction)
-        
         try:
             player.set_volume(volume / 100)
             await interaction.response.send_message(embed=MusicEmbeds.success(
@@ -452,33 +492,26 @@ class Music(commands.Cog):
             ))
     
     @app_commands.command(name="disconnect", description="Déconnecte le bot du canal vocal")
-    async def disconnect(self, interaction: discord.Interaction):
+    @requires_connection
+    async def disconnect(self, interaction: discord.Interaction, player: MusicPlayer):
         """
         Déconnecte le bot du canal vocal
         
         Usage: !disconnect
         """
-        player = self._get_player(interaction)
-        
-        if not player.is_connected():
-            await interaction.response.send_message(embed=MusicEmbeds.error(
-                "Le bot n'est pas connecté à un canal vocal."
-            ))
-            return
-        
         await player.disconnect()
         await interaction.response.send_message(embed=MusicEmbeds.success(
             "👋 Déconnecté du canal vocal."
         ))
     
     @app_commands.command(name="loop", description="Active/désactive la répétition")
-    async def loop(self, interaction: discord.Interaction):
+    @requires_connection
+    async def loop(self, interaction: discord.Interaction, player: MusicPlayer):
         """
         Active/désactive la répétition de la piste actuelle
         
         Usage: !loop
         """
-        player = self._get_player(interaction)
         player.loop = not player.loop
         
         status = "activée" if player.loop else "désactivée"
@@ -489,76 +522,53 @@ class Music(commands.Cog):
         ))
     
     @app_commands.command(name="shuffle", description="Mélange la file d'attente")
-    async def shuffle(self, interaction: discord.Interaction):
+    @requires_connection
+    async def shuffle(self, interaction: discord.Interaction, player: MusicPlayer):
         """
         Mélange aléatoirement la file d'attente
         
         Usage: !shuffle
         """
-        player = self._get_player(interaction)
-        
-        if not player.is_connected():
-            await interaction.response.send_message(embed=MusicEmbeds.error(
-                "Le bot n'est pas connecté à un canal vocal."
-            ))
-            return
-        
-        queue_size = await player.queue.size()
+        queue_size = await player.queue.shuffle()
         if queue_size == 0:
-            await interaction.response.send_message(embed=MusicEmbeds.error(
-                "La file d'attente est vide."
-            ))
+            await interaction.response.send_message(embed=_ERR_QUEUE_EMPTY)
             return
         
-        await player.queue.shuffle()
+        player.refresh_prefetch()
         await interaction.response.send_message(embed=MusicEmbeds.success(
             f"🔀 File d'attente mélangée ({queue_size} piste(s))."
         ))
     
     @app_commands.command(name="clear", description="Vide la file d'attente")
-    async def clear(self, interaction: discord.Interaction):
+    @requires_connection
+    async def clear(self, interaction: discord.Interaction, player: MusicPlayer):
         """
         Vide la file d'attente sans arrêter la lecture en cours
         
         Usage: !clear
         """
-        player = self._get_player(interaction)
-        
-        if not player.is_connected():
-            await interaction.response.send_message(embed=MusicEmbeds.error(
-                "Le bot n'est pas connecté à un canal vocal."
-            ))
-            return
-        
-        queue_size = await player.queue.size()
+        queue_size = await player.clear_queue()
         if queue_size == 0:
             await interaction.response.send_message(embed=MusicEmbeds.error(
                 "La file d'attente est déjà vide."
             ))
             return
         
-        await player.clear_queue()
         await interaction.response.send_message(embed=MusicEmbeds.success(
             f"🗑️ File d'attente vidée ({queue_size} piste(s) retirée(s))."
         ))
     
     @app_commands.command(name="remove", description="Retire une piste")
     @app_commands.describe(position="Position de la piste à retirer")
-    async def remove(self, interaction: discord.Interaction, position: int):
+    @requires_connection
+    async def remove(self, interaction: discord.Interaction, player: MusicPlayer, position: int):
         """
         Retire une piste de la file d'attente
         
         Usage: !remove <position>
         """
-        player = self._get_player(interaction)
-        
-        if not player.is_connected():
-            await interaction.response.send_message(embed=MusicEmbeds.error(
-                "Le bot n'est pas connecté à un canal vocal."
-            ))
-            return
-        
         removed_track = await player.queue.remove(position)
+        player.refresh_prefetch()
         
         if removed_track:
             await interaction.response.send_message(embed=MusicEmbeds.success(
@@ -571,21 +581,15 @@ class Music(commands.Cog):
     
     @app_commands.command(name="move", description="Déplace une piste")
     @app_commands.describe(from_pos="Position actuelle", to_pos="Nouvelle position")
-    async def move(self, interaction: discord.Interaction, from_pos: int, to_pos: int):
+    @requires_connection
+    async def move(self, interaction: discord.Interaction, player: MusicPlayer, from_pos: int, to_pos: int):
         """
         Déplace une piste dans la file d'attente
         
         Usage: !move <position_actuelle> <nouvelle_position>
         """
-        player = self._get_player(interaction)
-        
-        if not player.is_connected():
-            await interaction.response.send_message(embed=MusicEmbeds.error(
-                "Le bot n'est pas connecté à un canal vocal."
-            ))
-            return
-        
         moved_track = await player.queue.move(from_pos, to_pos)
+        player.refresh_prefetch()
         
         if moved_track:
             await interaction.response.send_message(embed=MusicEmbeds.success(
@@ -1,6 +1,7 @@
 """Cog de gestion des playlists pour le bot Discord"""
 
 import logging
+from dataclasses import replace
 from typing import Optional
 import discord
 from discord import app_commands
@@ -22,7 +23,7 @@ class PlaylistCog(commands.Cog):
         self.db: SQLiteDatabase = bot.db
     
     def _get_player(self, interaction: discord.Interaction) -> MusicPlayer:
-        """Récupère le player pour le serveur actuel"""
+        """Récupère ou crée le player pour le serveur actuel (chemins qui connectent le bot)"""
         return self.bot.get_player(interaction.guild)
     
     @app_commands.command(name="save_playlist", description="Sauvegarde la queue actuelle")
@@ -33,11 +34,12 @@ class PlaylistCog(commands.Cog):
         
         Usage: !save_playlist <nom>
         """
-        player = self._get_player(interaction)
+        # Lecture seule : ne pas créer de player pour un serveur où le bot n'est pas connecté
+        player = self.bot.players.get(interaction.guild_id)
         
         # Vérifier que la queue n'est pas vide
-        queue_tracks = await player.queue.get_list()
-        if not queue_tracks and not player.current:
+        queue_tracks = player.queue.get_list() if player else []
+        if not queue_tracks and not (player and player.current):
             await interaction.response.send_message(embed=MusicEmbeds.error(
                 "La file d'attente est vide. Ajoutez des pistes avant de sauvegarder."
             ))
@@ -112,6 +114,12 @@ class PlaylistCog(commands.Cog):
                 ))
                 return
             
+            if not interaction.user.voice:
+                await interaction.response.send_message(embed=MusicEmbeds.error(
+                    "Vous devez être dans un canal vocal pour charger une playlist."
+                ))
+                return
+            
             player = self._get_player(interaction)
             
             # Connecter le bot si nécessaire
@@ -125,14 +133,17 @@ class PlaylistCog(commands.Cog):
                 "Chargement"
             ))
             
-            # Ajouter toutes les pistes à la queue
-            added_count = 0
-            for pl_track in playlist.tracks:
-                # Rechercher la piste pour obtenir les métadonnées complètes
-                track = await player.youtube_source.search(pl_track.url, interaction.user)
-                if track:
-                    await player.add_track(track)
-                    added_count += 1
+            # Rechercher les pistes en parallèle pour obtenir les métadonnées complètes
+            tracks = await player.youtube_source.search_many(
+                [pl_track.url for pl_track in playlist.tracks],
+                interaction.user
+            )
+            tracks = [track for track in tracks if track]
+            
+            # Ajouter toutes les pistes à la queue en un seul lot
+            if tracks:
+                await player.add_tracks(tracks)
+            added_count = len(tracks)
             
             embed = discord.Embed(
                 title="✅ Playlist chargée",
@@ -293,16 +304,15 @@ class PlaylistCog(commands.Cog):
         
         Usage: !save_spotify_playlist <url_spotify> <nom>
         """
-        player = self._get_player(interaction)
-        
-        # Vérifier que c'est une URL Spotify
-        if not player.spotify_source.is_spotify_url(url):
+        # Vérifier que c'est une URL Spotify (et déterminer son type en une passe)
+        spotify_link = self.bot.spotify_source.extract_id_from_url(url)
+        if not spotify_link:
             await interaction.response.send_message(embed=MusicEmbeds.error(
                 "Veuillez fournir une URL Spotify valide (playlist ou album)."
             ))
             return
         
-        if not player.spotify_source.is_available():
+        if not self.bot.spotify_source.is_available():
             await interaction.response.send_message(embed=MusicEmbeds.error(
                 "L'intégration Spotify n'est pas configurée."
             ))
@@ -316,15 +326,7 @@ class PlaylistCog(commands.Cog):
         ))
         
         try:
-            # Déterminer le type de lien Spotify
-            result = player.spotify_source.extract_id_from_url(url)
-            if not result:
-                await loading_msg.edit(embed=MusicEmbeds.error(
-                    "URL Spotify invalide."
-                ))
-                return
-            
-            spotify_type, spotify_id = result
+            spotify_type, spotify_id = spotify_link
             
             # Seules les playlists et albums sont supportés
             if spotify_type not in ['playlist', 'album']:
@@ -335,9 +337,9 @@ class PlaylistCog(commands.Cog):
             
             # Récupérer les pistes Spotify
             if spotify_type == 'playlist':
-                spotify_tracks = await player.spotify_source.get_playlist(url)
+                spotify_tracks = await self.bot.spotify_source.get_playlist(url)
             else:
-                spotify_tracks = await player.spotify_source.get_album(url)
+                spotify_tracks = await self.bot.spotify_source.get_album(url)
             
             if not spotify_tracks:
                 await loading_msg.edit(embed=MusicEmbeds.error(
@@ -352,13 +354,17 @@ class PlaylistCog(commands.Cog):
                 owner_id=interaction.user.id
             )
             
+            # Rechercher sur YouTube en parallèle pour obtenir les URLs (ordre conservé)
+            tracks = await self.bot.youtube_source.search_many(
+                [spotify_track.search_query for spotify_track in spotify_tracks[:100]],  # Limiter à 100 pistes
+                interaction.user
+            )
+            
             # Convertir et ajouter toutes les pistes
             added_count = 0
-            for spotify_track in spotify_tracks[:100]:  # Limiter à 100 pistes
-                # Rechercher sur YouTube pour obtenir l'URL
-                track = await player.youtube_source.search(spotify_track.search_query, interaction.user)
+            for track in tracks:
                 if track:
-                    track.source = 'spotify'
+                    track = replace(track, source='spotify')
                     await self.db.add_track_to_playlist(playlist.id, track)
                     added_count += 1
             
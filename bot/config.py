@@ -44,6 +44,7 @@ class Config:
     INACTIVITY_TIMEOUT: int = int(os.getenv("INACTIVITY_TIMEOUT", "300"))  # 5 minutes
     ALONE_TIMEOUT: int = int(os.getenv("ALONE_TIMEOUT", "60"))  # 1 minute
     CONNECTION_TIMEOUT: int = int(os.getenv("CONNECTION_TIMEOUT", "10"))  # 10 secondes
+    STREAM_URL_TTL: int = int(os.getenv("STREAM_URL_TTL", "18000"))  # 5 heures (les URLs YouTube expirent après ~6h)
     
     # Base de données
     DATABASE_PATH: str = os.getenv("DATABASE_PATH", "data/music_bot.db")
@@ -60,6 +61,13 @@ class Config:
     MISTRAL_MODEL: str = os.getenv("MISTRAL_MODEL", "mistral-small-latest")
     MISTRAL_MAX_TOKENS: int = int(os.getenv("MISTRAL_MAX_TOKENS", "1000"))
     MISTRAL_TEMPERATURE: float = float(os.getenv("MISTRAL_TEMPERATURE", "0.7"))
+    MISTRAL_MAX_CONCURRENT_REQUESTS: int = int(os.getenv("MISTRAL_MAX_CONCURRENT_REQUESTS", "8"))
+    # Cache des réponses (désactivé par défaut, conseillé avec MISTRAL_TEMPERATURE=0)
+    MISTRAL_CACHE_ENABLED: bool = os.getenv("MISTRAL_CACHE_ENABLED", "false").lower() == "true"
+    MISTRAL_CACHE_SIZE: int = int(os.getenv("MISTRAL_CACHE_SIZE", "1024"))
+    MISTRAL_SEMANTIC_CACHE: bool = os.getenv("MISTRAL_SEMANTIC_CACHE", "false").lower() == "true"
+    MISTRAL_SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("MISTRAL_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    MISTRAL_EMBED_MODEL: str = os.getenv("MISTRAL_EMBED_MODEL", "mistral-embed")
     
     @classmethod
     def validate(cls) -> bool:
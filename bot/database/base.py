@@ -125,6 +125,33 @@ class DatabaseInterface(ABC):
         """
         pass
     
+    @abstractmethod
+    async def get_template_by_id(self, template_id: int) -> Optional[AITemplate]:
+        """
+        Récupère un template IA par son ID
+        
+        Args:
+            template_id: ID du template
+            
+        Returns:
+            Template ou None si non trouvé
+        """
+        pass
+    
+    @abstractmethod
+    async def get_template_by_name(self, guild_id: int, name: str) -> Optional[AITemplate]:
+        """
+        Récupère un template IA par son nom dans un serveur
+        
+        Args:
+            guild_id: ID du serveur
+            name: Nom du template
+            
+        Returns:
+            Template ou None si non trouvé
+        """
+        pass
+    
     @abstractmethod
     async def get_all_templates(self, guild_id: int) -> List[AITemplate]:
         """
@@ -200,6 +227,20 @@ class DatabaseInterface(ABC):
         """
         pass
     
+    @abstractmethod
+    async def count_conversation_history(self, guild_id: int, channel_id: int) -> int:
+        """
+        Compte les messages de conversation d'un canal
+        
+        Args:
+            guild_id: ID du serveur
+            channel_id: ID du canal
+            
+        Returns:
+            Nombre de messages
+        """
+        pass
+    
     @abstractmethod
     async def save_message(self, message: ConversationMessage) -> ConversationMessage:
         """
@@ -213,6 +254,39 @@ class DatabaseInterface(ABC):
         """
         pass
     
+    @abstractmethod
+    async def save_messages(self, messages: List[ConversationMessage]) -> List[ConversationMessage]:
+        """
+        Sauvegarde plusieurs messages de conversation en une seule transaction
+        
+        Args:
+            messages: Messages à sauvegarder (dans l'ordre chronologique)
+            
+        Returns:
+            Messages sauvegardés avec leur ID
+        """
+        pass
+    
+    @abstractmethod
+    async def prune_conversation_history(
+        self,
+        guild_id: int,
+        channel_id: int,
+        keep_count: int
+    ) -> int:
+        """
+        Supprime les messages les plus anciens au-delà d'une limite
+        
+        Args:
+            guild_id: ID du serveur
+            channel_id: ID du canal
+            keep_count: Nombre de messages récents à conserver
+            
+        Returns:
+            Nombre de messages supprimés
+        """
+        pass
+    
     @abstractmethod
     async def clear_conversation_history(self, guild_id: int, channel_id: int) -> bool:
         """
@@ -227,6 +301,32 @@ class DatabaseInterface(ABC):
         """
         pass
     
+    # ==================== Bot Settings Methods ====================
+    
+    @abstractmethod
+    async def get_setting(self, key: str) -> Optional[str]:
+        """
+        Récupère une valeur interne du bot
+        
+        Args:
+            key: Clé du paramètre
+            
+        Returns:
+            Valeur enregistrée ou None si absente
+        """
+        pass
+    
+    @abstractmethod
+    async def set_setting(self, key: str, value: str) -> None:
+        """
+        Enregistre une valeur interne du bot
+        
+        Args:
+            key: Clé du paramètre
+            value: Valeur à enregistrer
+        """
+        pass
+    
     @abstractmethod
     async def close(self) -> None:
         """Ferme la connexion à la base de données"""
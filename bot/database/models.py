@@ -77,7 +77,7 @@ class AITemplate:
             self.updated_at = datetime.now()
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationMessage:
     """Représente un message dans l'historique de conversation"""
     
@@ -17,6 +17,13 @@ logger = logging.getLogger(__name__)
 class SQLiteDatabase(DatabaseInterface):
     """Implémentation SQLite de la base de données"""
     
+    # Nombre de requêtes préparées conservées par la connexion (toutes les
+    # requêtes du bot y tiennent, elles ne sont donc analysées qu'une fois)
+    CACHED_STATEMENTS = 256
+    
+    # Cache de pages SQLite (valeur négative = taille en Kio)
+    PAGE_CACHE_KIB = 20000
+    
     def __init__(self, db_path: str = None):
         """
         Initialise la connexion SQLite
@@ -34,7 +41,11 @@ class SQLiteDatabase(DatabaseInterface):
             Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
             
             # Ouvrir la connexion
-            self.connection = await aiosqlite.connect(self.db_path)
+            self.connection = await aiosqlite.connect(
+                self.db_path,
+                cached_statements=self.CACHED_STATEMENTS
+            )
+            await self.connection.execute(f"PRAGMA cache_size = -{self.PAGE_CACHE_KIB}")
             
             # Créer les tables
             await self._create_tables()
@@ -128,6 +139,19 @@ class SQLiteDatabase(DatabaseInterface):
                 ON conversation_history(guild_id, channel_id, timestamp)
             """)
             
+            await cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_conversation_guild_channel_id 
+                ON conversation_history(guild_id, channel_id, id)
+            """)
+            
+            # Table des paramètres internes du bot (clé -> valeur)
+            await cursor.execute("""
+                CREATE TABLE IF NOT EXISTS bot_settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+            
             await self.connection.commit()
     
     async def create_playlist(self, name: str, guild_id: int, owner_id: int) -> Playlist:
@@ -351,6 +375,54 @@ class SQLiteDatabase(DatabaseInterface):
                 updated_at=datetime.fromisoformat(row[6])
             )
     
+    async def get_template_by_id(self, template_id: int) -> Optional[AITemplate]:
+        """Récupère un template IA par son ID"""
+        async with self.connection.cursor() as cursor:
+            await cursor.execute("""
+                SELECT id, guild_id, name, system_prompt, is_active, created_at, updated_at
+                FROM ai_templates
+                WHERE id = ?
+                LIMIT 1
+            """, (template_id,))
+            
+            row = await cursor.fetchone()
+            if not row:
+                return None
+            
+            return AITemplate(
+                id=row[0],
+                guild_id=row[1],
+                name=row[2],
+                system_prompt=row[3],
+                is_active=bool(row[4]),
+                created_at=datetime.fromisoformat(row[5]),
+                updated_at=datetime.fromisoformat(row[6])
+            )
+    
+    async def get_template_by_name(self, guild_id: int, name: str) -> Optional[AITemplate]:
+        """Récupère un template IA par son nom (index de la contrainte UNIQUE(name, guild_id))"""
+        async with self.connection.cursor() as cursor:
+            await cursor.execute("""
+                SELECT id, guild_id, name, system_prompt, is_active, created_at, updated_at
+                FROM ai_templates
+                WHERE name = ? AND guild_id = ?
+                LIMIT 1
+            """, (name, guild_id))
+            
+            row = await cursor.fetchone()
+            if not row:
+                return None
+            
+            return AITemplate(
+                id=row[0],
+                guild_id=row[1],
+                name=row[2],
+                system_prompt=row[3],
+                is_active=bool(row[4]),
+                created_at=datetime.fromisoformat(row[5]),
+                updated_at=datetime.fromisoformat(row[6])
+            )
+    
     async def get_all_templates(self, guild_id: int) -> List[AITemplate]:
         """Récupère tous les templates IA d'un serveur"""
         async with self.connection.cursor() as cursor:
@@ -465,17 +537,21 @@ class SQLiteDatabase(DatabaseInterface):
     ) -> List[ConversationMessage]:
         """Récupère l'historique de conversation pour un canal"""
         async with self.connection.cursor() as cursor:
+            # Les N plus récents via l'index, remis dans l'ordre chronologique par SQLite
             await cursor.execute("""
                 SELECT id, guild_id, channel_id, user_id, role, content, timestamp
-                FROM conversation_history
-                WHERE guild_id = ? AND channel_id = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
+                FROM (
+                    SELECT id, guild_id, channel_id, user_id, role, content, timestamp
+                    FROM conversation_history
+                    WHERE guild_id = ? AND channel_id = ?
+                    ORDER BY id DESC
+                    LIMIT ?
+                )
+                ORDER BY id ASC
             """, (guild_id, channel_id, limit))
             
             rows = await cursor.fetchall()
             
-            # Inverser pour avoir du plus ancien au plus récent
             messages = [
                 ConversationMessage(
                     id=row[0],
@@ -486,11 +562,22 @@ class SQLiteDatabase(DatabaseInterface):
                     content=row[5],
                     timestamp=datetime.fromisoformat(row[6])
                 )
-                for row in reversed(rows)
+                for row in rows
             ]
             
             return messages
     
+    async def count_conversation_history(self, guild_id: int, channel_id: int) -> int:
+        """Compte les messages de conversation d'un canal"""
+        async with self.connection.cursor() as cursor:
+            await cursor.execute("""
+                SELECT COUNT(*) FROM conversation_history
+                WHERE guild_id = ? AND channel_id = ?
+            """, (guild_id, channel_id))
+            
+            row = await cursor.fetchone()
+            return row[0]
+    
     async def save_message(self, message: ConversationMessage) -> ConversationMessage:
         """Sauvegarde un message de conversation"""
         async with self.connection.cursor() as cursor:
@@ -511,6 +598,77 @@ class SQLiteDatabase(DatabaseInterface):
             
             return message
     
+    async def save_messages(self, messages: List[ConversationMessage]) -> List[ConversationMessage]:
+        """
+        Sauvegarde plusieurs messages de conversation en une seule transaction
+        
+        Tout ou rien : en cas d'échec, les insertions déjà faites sont annulées
+        (sinon le prochain commit de la connexion partagée les écrirait).
+        """
+        if not messages:
+            return messages
+        
+        async with self.connection.cursor() as cursor:
+            try:
+                await cursor.executemany("""
+                    INSERT INTO conversation_history (guild_id, channel_id, user_id, role, content, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [
+                    (
+                        message.guild_id,
+                        message.channel_id,
+                        message.user_id,
+                        message.role,
+                        message.content,
+                        message.timestamp
+                    )
+                    for message in messages
+                ])
+                
+                # Les ids AUTOINCREMENT d'une même transaction sont consécutifs
+                await cursor.execute("SELECT last_insert_rowid()")
+                last_id = (await cursor.fetchone())[0]
+                
+                await self.connection.commit()
+            except Exception:
+                await self.connection.rollback()
+                raise
+            
+            first_id = last_id - len(messages) + 1
+            for index, message in enumerate(messages):
+                message.id = first_id + index
+
+            return messages
+    
+    async def prune_conversation_history(
+        self,
+        guild_id: int,
+        channel_id: int,
+        keep_count: int
+    ) -> int:
+        """Supprime les messages les plus anciens au-delà de keep_count"""
+        async with self.connection.cursor() as cursor:
+            # Les messages à conserver sont les keep_count plus récents (id croissant)
+            await cursor.execute("""
+                DELETE FROM conversation_history
+                WHERE guild_id = ? AND channel_id = ? AND (? <= 0 OR id < (
+                    SELECT COALESCE(MIN(id), -1) FROM (
+                        SELECT id FROM conversation_history
+                        WHERE guild_id = ? AND channel_id = ?
+                        ORDER BY id DESC
+                        LIMIT ?
+                    )
+                ))
+            """, (guild_id, channel_id, keep_count, guild_id, channel_id, keep_count))
+            
+            await self.connection.commit()
+            
+            deleted = max(cursor.rowcount, 0)
+            if deleted:
+                logger.info("%d ancien(s) message(s) supprimé(s) pour guild %s, channel %s", deleted, guild_id, channel_id)
+            
+            return deleted
+    
     async def clear_conversation_history(self, guild_id: int, channel_id: int) -> bool:
         """Efface l'historique de conversation pour un canal"""
         async with self.connection.cursor() as cursor:
@@ -523,10 +681,32 @@ class SQLiteDatabase(DatabaseInterface):
             
             deleted = cursor.rowcount > 0
             if deleted:
-                logger.info(f"Historique effacé pour guild {guild_id}, channel {channel_id}")
+                logger.info("Historique effacé pour guild %s, channel %s", guild_id, channel_id)
             
             return deleted
     
+    # ==================== Bot Settings Methods ====================
+    
+    async def get_setting(self, key: str) -> Optional[str]:
+        """Récupère une valeur interne du bot"""
+        async with self.connection.cursor() as cursor:
+            await cursor.execute("""
+                SELECT value FROM bot_settings WHERE key = ?
+            """, (key,))
+            
+            row = await cursor.fetchone()
+            return row[0] if row else None
+    
+    async def set_setting(self, key: str, value: str) -> None:
+        """Enregistre une valeur interne du bot"""
+        async with self.connection.cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO bot_settings (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, (key, value))
+            
+            await self.connection.commit()
+    
     async def close(self) -> None:
         """Ferme la connexion à la base de données"""
         if self.connection:
@@ -5,6 +5,7 @@ import sys
 import asyncio
 from bot.bot import MusicBot
 from bot.config import Config
+from bot.utils import fast_json
 
 
 def setup_logging():
@@ -53,6 +54,9 @@ async def main():
         logger.error(f"Erreur de configuration: {e}")
         sys.exit(1)
     
+    # Décodage JSON accéléré pour yt-dlp (avant la création de YouTubeSource)
+    fast_json.install()
+    
     # Créer et lancer le bot
     bot = MusicBot()
     
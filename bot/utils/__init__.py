@@ -2,6 +2,7 @@
 
 from . import embeds
 from . import exceptions
+from . import fast_json
 from . import views
 
-__all__ = ["embeds", "exceptions", "views"]
+__all__ = ["embeds", "exceptions", "fast_json", "views"]
@@ -159,7 +159,7 @@ class MusicEmbeds:
         Returns:
             Embed Discord formaté
         """
-        tracks = await queue.get_list()
+        tracks = queue.get_list()
         total_tracks = len(tracks)
         
         if total_tracks == 0 and not current:
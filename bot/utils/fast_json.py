@@ -0,0 +1,56 @@
+"""Décodage JSON accéléré (orjson) pour les extractions yt-dlp"""
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Arguments de json.loads qu'orjson reproduit à l'identique ; `cls` n'est accepté
+# que pour le décodeur « lenient » de yt-dlp utilisé sans ses options de réparation
+_SUPPORTED_KWARGS = frozenset({'cls', 'strict'})
+_LENIENT_OPTIONS = frozenset({'transform_source', 'ignore_extra', 'close_objects'})
+
+
+def install() -> bool:
+    """
+    Remplace json.loads par une version basée sur orjson
+    
+    yt-dlp décode via json.loads les réponses player de YouTube (plusieurs
+    centaines de Ko par vidéo). Le chemin rapide n'est pris que pour les appels
+    sans option de décodage spécifique ; en cas d'échec d'orjson (NaN, entier
+    hors 64 bits...) le json.loads d'origine est utilisé, le résultat est donc
+    identique.
+    
+    Returns:
+        True si orjson est disponible et le remplacement installé
+    """
+    try:
+        import orjson
+    except ImportError:
+        logger.info("orjson non installé - décodage JSON standard conservé")
+        return False
+    
+    original_loads = json.loads
+    if getattr(original_loads, '_orjson_shim', False):
+        return True
+    
+    def loads(s, *args, **kwargs):
+        if args or any(
+            key not in _SUPPORTED_KWARGS and not (key in _LENIENT_OPTIONS and not value)
+            for key, value in kwargs.items()
+        ):
+            return original_loads(s, *args, **kwargs)
+        
+        decoder = kwargs.get('cls')
+        if decoder is not None and decoder is not json.JSONDecoder and decoder.__module__.split('.')[0] != 'yt_dlp':
+            return original_loads(s, *args, **kwargs)
+        
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            return original_loads(s, *args, **kwargs)
+    
+    loads._orjson_shim = True
+    json.loads = loads
+    logger.info("Décodage JSON accéléré par orjson")
+    return True
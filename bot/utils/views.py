@@ -2,9 +2,13 @@
 
 import discord
 from discord.ui import View, Button
-from typing import Optional
+from typing import Dict, Optional
 import asyncio
 
+from bot.audio.queue import MusicQueue
+from bot.audio.track import Track
+from bot.utils.embeds import MusicEmbeds
+
 
 class MusicControlView(View):
     """Vue avec boutons de contrôle de lecture"""
@@ -80,19 +84,39 @@ class MusicControlView(View):
 
 
 class QueuePaginationView(View):
-    """Vue avec pagination pour la queue"""
+    """Vue avec pagination pour la queue (pages construites à la demande)"""
     
-    def __init__(self, embeds: list, timeout=120):
+    def __init__(self, queue: MusicQueue, current: Optional[Track], total_pages: int, initial_page: int = 0, timeout=120):
         super().__init__(timeout=timeout)
-        self.embeds = embeds
-        self.current_page = 0
+        self.queue = queue
+        self.current = current
+        self.total_pages = total_pages
+        self.current_page = initial_page
         self.message: Optional[discord.Message] = None
+        # index de page -> embed déjà construit
+        self._embed_cache: Dict[int, discord.Embed] = {}
         self._update_buttons()
     
+    async def get_embed(self, page: int) -> discord.Embed:
+        """
+        Retourne l'embed d'une page, construit au premier affichage
+        
+        Args:
+            page: Index de la page (à partir de 0)
+            
+        Returns:
+            Embed de la page
+        """
+        embed = self._embed_cache.get(page)
+        if embed is None:
+            embed = await MusicEmbeds.queue_list(self.queue, self.current, page + 1)
+            self._embed_cache[page] = embed
+        return embed
+    
     def _update_buttons(self):
         """Met à jour l'état des boutons"""
         self.previous_button.disabled = self.current_page == 0
-        self.next_button.disabled = self.current_page >= len(self.embeds) - 1
+        self.next_button.disabled = self.current_page >= self.total_pages - 1
     
     @discord.ui.button(label="◀️", style=discord.ButtonStyle.primary)
     async def previous_button(self, interaction: discord.Interaction, button: Button):
@@ -101,18 +125,18 @@ class QueuePaginationView(View):
             self.current_page -= 1
             self._update_buttons()
             await interaction.response.edit_message(
-                embed=self.embeds[self.current_page],
+                embed=await self.get_embed(self.current_page),
                 view=self
             )
     
     @discord.ui.button(label="▶️", style=discord.ButtonStyle.primary)
     async def next_button(self, interaction: discord.Interaction, button: Button):
         """Bouton page suivante"""
-        if self.current_page < len(self.embeds) - 1:
+        if self.current_page < self.total_pages - 1:
             self.current_page += 1
             self._update_buttons()
             await interaction.response.edit_message(
-                embed=self.embeds[self.current_page],
+                embed=await self.get_embed(self.current_page),
                 view=self
             )
     